@@ -1,8 +1,17 @@
 import streamlit as st
-from transformers import pipeline
-import torch
+import os
+import threading
 import time
 import plotly.graph_objects as go
+from artifact import DEFAULT_ARTIFACT_DIR, load_artifact, read_manifest, warm_up
+from background import BackgroundScorer
+from cache import ResultCache
+from documents import STREAM_WINDOW, analyze_document, pdf_sections, summarize, text_sections
+from engine import DEFAULT_BATCH_SIZE, DEFAULT_MODEL, label_map, load_scorer
+from ingredients import analyze_ingredients
+from ensemble import EnsembleScorer
+from metrics import render, timed
+from registry import ModelRegistry, RegisteredScorer, model_key
 
 # Set page config
 st.set_page_config(
@@ -114,66 +123,126 @@ if 'classifier' not in st.session_state:
     st.session_state.classifier = None
 if 'model_loaded' not in st.session_state:
     st.session_state.model_loaded = False
+# Last finished analysis, re-rendered on widget reruns without running the model
+if 'analysis' not in st.session_state:
+    st.session_state.analysis = None
+
+def startup_model():
+    """Model loaded at startup: the artifact's, if one is set and readable"""
+    if not DEFAULT_ARTIFACT_DIR:
+        return DEFAULT_MODEL
+    try:
+        return read_manifest(DEFAULT_ARTIFACT_DIR)["model"]
+    except Exception as e:
+        st.error(f"Error reading model artifact {DEFAULT_ARTIFACT_DIR}: {str(e)}")
+        return DEFAULT_MODEL
+
+# Models users can pick in the sidebar; the first is loaded at startup
+STARTUP_MODEL = startup_model()
+MODEL_CHOICES = list(dict.fromkeys([STARTUP_MODEL, DEFAULT_MODEL, "facebook/bart-large-mnli"]))
+ENSEMBLE_CHOICE = "Ensemble (all models)"
+
+@st.cache_resource
+def load_registry():
+    """Models shared by every session, loaded on first use within the memory budget"""
+    return ModelRegistry(cache=ResultCache())
 
 @st.cache_resource 
 def load_model():
     """Load the zero-shot classification model"""
     try:
-        classifier = pipeline(
-            "zero-shot-classification",
-            model="typeform/distilbert-base-uncased-mnli",
-            device=0 if torch.cuda.is_available() else -1
-        )
-        return classifier
+        # Scores are cached in memory and on disk, shared by every session
+        if DEFAULT_ARTIFACT_DIR:
+            # Prebuilt local artifact: no hub lookups, weights mapped from disk
+            scorer = load_artifact(DEFAULT_ARTIFACT_DIR, cache=ResultCache())
+            warm_up(scorer)
+        else:
+            scorer = load_scorer(cache=ResultCache())
+        # The default model stays loaded; other choices are evicted when memory runs short
+        load_registry().register(model_key(STARTUP_MODEL), scorer)
+        return scorer
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
         return None
 
-# Label mapping for main categories and their detailed indicators
-label_map = {
-    "Greenwashing": [
-        "Misleading environmental claim",
-        "Vague sustainability statement",
-        "Unsubstantiated green marketing",
-        "Overstated eco-friendly benefits",
-        "Use of irrelevant green imagery"
-    ],
-    "Genuine Sustainability": [
-        "Authentic environmental commitment",
-        "Verified sustainable practice",
-        "Third-party sustainability certification",
-        "Transparency in environmental impact",
-        "Evidence-based climate action"
-    ],
-    "Marketing Hype": [
-        "Generic green buzzwords",
-        "Emotional appeal without proof",
-        "Sustainability used as a selling point",
-        "Trendy environmental phrasing"
-    ]
-}
-
-def analyze_claim(text, classifier):
-    """Analyze sustainability claim for greenwashing"""
-    candidate_labels = [
-        "Greenwashing",
-        "Genuine Sustainability",
-        "Marketing Hype"
-    ]
-    # Use all detailed labels from label_map
-    detailed_labels = []
-    for labels in label_map.values():
-        detailed_labels.extend(labels)
+@st.cache_resource
+def load_ensemble(_classifier):
+    """Every model choice scoring each claim side by side, with scores averaged"""
+    others = [RegisteredScorer(load_registry(), model_key(name)) for name in MODEL_CHOICES[1:]]
+    return EnsembleScorer([_classifier] + others)
+
+def select_model(model_name):
+    """Scorer for the model chosen in the sidebar"""
+    if model_name == MODEL_CHOICES[0]:
+        return st.session_state.classifier
+    if model_name == ENSEMBLE_CHOICE:
+        return load_ensemble(st.session_state.classifier)
+    return RegisteredScorer(load_registry(), model_key(model_name))
+
+@st.cache_resource
+def load_background(model_name, _classifier):
+    """Model thread shared by every session; claims from concurrent users are scored together"""
+    return BackgroundScorer(_classifier)
+
+def wait_for(future):
+    """Wait for a background analysis, returning (result, detailed_result)"""
     try:
-        # Primary classification
-        result = classifier(text, candidate_labels, multi_label=True)
-        # Detailed analysis
-        detailed_result = classifier(text, detailed_labels, multi_label=True)
-        return result, detailed_result
+        return future.result()
     except Exception as e:
         st.error(f"Error during classification: {str(e)}")
         return None, None
 
+def analyze_claims(texts, classifier, batch_size=DEFAULT_BATCH_SIZE):
+    """Analyze many claims at once, returning results in input order"""
+    try:
+        # Claims are length-bucketed and scored as (claim, label) pair batches
+        return list(classifier.analyze_many(texts, batch_size=batch_size))
+    except Exception as e:
+        st.error(f"Error during batch classification: {str(e)}")
+        return []
+
+# Serializes updates to the shared gauge figures across sessions
+GAUGE_LOCK = threading.Lock()
+CONFIDENCE_COLUMN = st.column_config.ProgressColumn(format="%.1f%%", min_value=0, max_value=100)
+
+@st.cache_resource
+def gauge_template(prediction, color, above_half):
+    """Gauge figure built once per prediction style; display_results only sets its value"""
+    fig = go.Figure(go.Indicator(
+    mode="gauge+number",
+    value=0,
+    number={
+        'suffix': " %",
+        'font': {'size': 28, 'color': color}
+    },
+    title={
+        'text': f"<b>{prediction}</b>",
+        'font': {'size': 20}
+    },
+    gauge={
+        'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "#444"},
+        'bar': {'color': color, 'thickness': 0.2},
+        'bgcolor': "white",
+        'borderwidth': 1,
+        'bordercolor': "#ccc",
+        'steps': [
+            {'range': [0, 50], 'color': '#f2f2f2'},
+            {'range': [50, 100], 'color': '#e6f4ea' if above_half else '#fbeaea'}
+        ],
+        'threshold': {
+            'line': {'color': color, 'width': 2},
+            'thickness': 0.7,
+            'value': 0
+        },
+    }
+))
+
+    fig.update_layout(
+        margin=dict(t=10, b=10, l=10, r=10),
+        height=250  # Reduce overall height
+    )
+    return fig
+
 def display_results(result, detailed_result, text):
     """Display classification results"""
     if result is None:
@@ -209,50 +278,28 @@ def display_results(result, detailed_result, text):
         <p><strong>Confidence:</strong> {confidence:.2%}</p>
     </div>
     """, unsafe_allow_html=True)
+    if "agreement" in result:
+        votes = ", ".join(f"{model}: {verdict}" for model, verdict in result["votes"].items())
+        st.caption(f"Model agreement: {result['agreement']:.0%} ({votes})")
 
     # Big bold gauge chart for top prediction
     st.markdown("#### Main Classification Confidence")
-    fig = go.Figure(go.Indicator(
-    mode="gauge+number",
-    value=confidence * 100,
-    number={
-        'suffix': " %",
-        'font': {'size': 28, 'color': color}
-    },
-    title={
-        'text': f"<b>{prediction}</b>",
-        'font': {'size': 20}
-    },
-    gauge={
-        'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "#444"},
-        'bar': {'color': color, 'thickness': 0.2},
-        'bgcolor': "white",
-        'borderwidth': 1,
-        'bordercolor': "#ccc",
-        'steps': [
-            {'range': [0, 50], 'color': '#f2f2f2'},
-            {'range': [50, 100], 'color': '#e6f4ea' if confidence >= 0.5 else '#fbeaea'}
-        ],
-        'threshold': {
-            'line': {'color': color, 'width': 2},
-            'thickness': 0.7,
-            'value': confidence * 100
-        },
-    }
-))
-
-    fig.update_layout(
-        margin=dict(t=10, b=10, l=10, r=10),
-        height=250  # Reduce overall height
-    )
-        # Display
-    st.plotly_chart(fig, use_container_width=True)
+    fig = gauge_template(prediction, color, confidence >= 0.5)
+    with GAUGE_LOCK:
+        # Only the value changes between results of the same style
+        with fig.batch_update():
+            fig.data[0].value = confidence * 100
+            fig.data[0].gauge.threshold.value = confidence * 100
+        st.plotly_chart(fig, use_container_width=True)
     
     # Confidence visualization
     st.subheader("Confidence Scores")
-    for label, score in zip(result['labels'], result['scores']):
-        st.metric(label, f"{score:.2%}")
-        st.progress(score)
+    st.dataframe(
+        {"Category": result['labels'], "Confidence": [score * 100 for score in result['scores']]},
+        column_config={"Confidence": CONFIDENCE_COLUMN},
+        hide_index=True,
+        use_container_width=True,
+    )
     
 
 #         st.subheader("Detailed Analysis")
@@ -282,7 +329,11 @@ def display_results(result, detailed_result, text):
 #             for label, score in grouped["Marketing Hype"]:
 #                 st.write(f"• {label}: {score:.2%}")
 # Detailed analysis with improved layout
-    if detailed_result:
+    display_details(detailed_result)
+
+def display_details(detailed_result):
+    """Display detailed indicator scores grouped by main category"""
+    if detailed_result and detailed_result['labels']:
         st.markdown("---")
         st.markdown("### 🔍 Detailed Indicator Analysis")
         
@@ -302,6 +353,8 @@ def display_results(result, detailed_result, text):
             st.markdown("**🚨 Greenwashing Indicators**")
             for label, score in grouped["Greenwashing"][:3]:  # Show top 3
                 st.write(f"• {label}: {score:.1%}")
+            if not grouped["Greenwashing"]:
+                st.caption("Not scored: category well below the top prediction")
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col2:
@@ -309,6 +362,8 @@ def display_results(result, detailed_result, text):
             st.markdown("**✅ Genuine Sustainability Indicators**")
             for label, score in grouped["Genuine Sustainability"][:3]:  # Show top 3
                 st.write(f"• {label}: {score:.1%}")
+            if not grouped["Genuine Sustainability"]:
+                st.caption("Not scored: category well below the top prediction")
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col3:
@@ -316,7 +371,88 @@ def display_results(result, detailed_result, text):
             st.markdown("**📢 Marketing Hype Indicators**")
             for label, score in grouped["Marketing Hype"][:3]:  # Show top 3
                 st.write(f"• {label}: {score:.1%}")
+            if not grouped["Marketing Hype"]:
+                st.caption("Not scored: category well below the top prediction")
             st.markdown('</div>', unsafe_allow_html=True)
+def display_results_table(results):
+    """Display many scored claims as one table instead of a card per claim"""
+    table = {"Claim": [], "Prediction": [], "Confidence": [], "Top indicator": []}
+    for label in label_map:
+        table[label] = []
+    for result, detailed_result in results:
+        scores = dict(zip(result['labels'], result['scores']))
+        table["Claim"].append(result['sequence'])
+        table["Prediction"].append(result['labels'][0])
+        table["Confidence"].append(result['scores'][0] * 100)
+        table["Top indicator"].append(detailed_result['labels'][0] if detailed_result['labels'] else "")
+        for label in label_map:
+            table[label].append(scores[label] * 100)
+        if "agreement" in result:
+            table.setdefault("Agreement", []).append(result['agreement'] * 100)
+    st.dataframe(
+        table,
+        column_config={column: CONFIDENCE_COLUMN for column in ["Confidence", *label_map, "Agreement"]},
+        hide_index=True,
+        use_container_width=True,
+    )
+
+def display_ingredients(analysis):
+    """Display the impact of every ingredient in a list"""
+    summary = analysis["summary"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("⚠️ Concerns", summary.get("concern", 0))
+    col2.metric("✅ Positive", summary.get("positive", 0) + summary.get("mitigated", 0))
+    col3.metric("❓ Unclear", summary.get("ambiguous", 0) + summary.get("unknown", 0))
+    st.dataframe([
+        {
+            "Ingredient": item["ingredient"],
+            "Impact": item["impact"],
+            "Why": item["note"],
+            "Source": item["source"],
+        }
+        for item in analysis["ingredients"]
+    ], use_container_width=True)
+
+def display_report(sections, classifier):
+    """Score a report and render per-section results as they stream in"""
+    status = st.empty()
+    table = st.empty()
+    rows, summaries = [], []
+    last_render = 0
+    try:
+        for summary in analyze_document(sections, classifier, window=STREAM_WINDOW):
+            summaries.append(summary)
+            verdicts = summary["verdicts"]
+            rows.append({
+                "Section": summary["section"],
+                "Claims": summary["claims"],
+                "Dominant verdict": max(verdicts, key=verdicts.get) if summary["claims"] else "-",
+                "Mean greenwashing score": f"{summary['mean_scores']['Greenwashing']:.1%}",
+            })
+            # Re-render at most twice a second so long reports don't flood the browser
+            if time.time() - last_render > 0.5:
+                status.info(f"Analyzed {len(rows)} sections...")
+                table.dataframe(rows, use_container_width=True)
+                last_render = time.time()
+    except Exception as e:
+        st.error(f"Error during report analysis: {str(e)}")
+        return
+    table.dataframe(rows, use_container_width=True)
+
+    totals = summarize(summaries)
+    status.success(f"Analyzed {totals['sections']} sections, {totals['claims']} claims out of {totals['sentences']} sentences.")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🚨 Greenwashing", totals["verdicts"]["Greenwashing"])
+    col2.metric("✅ Genuine Sustainability", totals["verdicts"]["Genuine Sustainability"])
+    col3.metric("📢 Marketing Hype", totals["verdicts"]["Marketing Hype"])
+
+    flagged = [claim for summary in summaries for claim in summary["top_greenwashing_claims"]]
+    flagged.sort(key=lambda claim: claim["score"], reverse=True)
+    if flagged:
+        st.markdown("**Claims most likely to be greenwashing:**")
+        for claim in flagged[:10]:
+            st.write(f"• {claim['claim']} ({claim['score']:.1%})")
+
 def main():
     # Header
     st.markdown('''
@@ -359,6 +495,11 @@ def main():
         - **Analysis**: Multi-label confidence scoring
         - **Accuracy**: Trained on millions of text samples
         """)
+        model_name = st.selectbox(
+            "Model:",
+            MODEL_CHOICES + [ENSEMBLE_CHOICE],
+            help="Other models are loaded on first use and unloaded when memory runs short"
+        )
         
         st.markdown("---")
         st.markdown("## 📊 Interpretation Guide")
@@ -381,6 +522,9 @@ def main():
             else:
                 st.error("Failed to load model. Please try again.")
                 return
+    classifier = select_model(model_name)
+    # Every analysis below runs on the shared model thread, not this script thread
+    background = load_background(model_name, classifier) if classifier else None
 
     examples = [
         "Our product is eco-friendly and good for the environment.",
@@ -402,13 +546,24 @@ def main():
         claim_text = selected_example
 
     # Analysis button
+    analysis = st.session_state.analysis
     if st.button("Analyze Claim", type="primary"):
         if claim_text.strip():
-            if st.session_state.classifier:
+            if classifier:
+                verdict, full = background.analyze(claim_text)
                 with st.spinner("Analyzing claim..."):
-                    result, detailed_result = analyze_claim(claim_text, st.session_state.classifier)
+                    result, _ = wait_for(verdict)
                 if result:
-                    display_results(result, detailed_result, claim_text)
+                    # Verdict first; detailed indicators follow once scored
+                    with timed("render"):
+                        display_results(result, None, claim_text)
+                    with st.spinner("Scoring detailed indicators..."):
+                        result, detailed_result = wait_for(full)
+                    with timed("render"):
+                        display_details(detailed_result)
+                    st.session_state.analysis = {
+                        "claim": claim_text, "model": model_name, "result": result, "detailed_result": detailed_result
+                    }
                     # Additional insights
                     st.markdown("---")
                     st.markdown("### 💡 Tips for Identifying Greenwashing")
@@ -422,27 +577,74 @@ def main():
                 st.error("Model not loaded. Please refresh the page.")
         else:
             st.warning("Please enter a sustainability claim to analyze.")
+    elif analysis and (analysis["claim"], analysis["model"]) == (claim_text, model_name):
+        # Other widgets were used: show the finished analysis again without re-running the model
+        with timed("render"):
+            display_results(analysis["result"], analysis["detailed_result"], claim_text)
     
     # Future features section
     st.markdown("---")
     st.markdown("### 🚀 Coming Soon")
     st.markdown("""
-    - **Product Ingredients Analysis**: Upload ingredient lists for sustainability assessment
-    - **Batch Analysis**: Analyze multiple claims at once
-    - **Company Sustainability Reports**: Analyze entire sustainability reports
     - **Historical Tracking**: Track changes in sustainability claims over time
     """)
     
-    # Ingredients analysis placeholder (for future implementation)
-    with st.expander("🧪 Product Ingredients Analysis (Coming Soon)"):
-        st.markdown("This feature will allow you to analyze product ingredients for sustainability claims.")
+    # Batch analysis
+    with st.expander("📋 Batch Analysis"):
+        st.markdown("Paste one claim per line to score them all at once.")
+        batch_text = st.text_area("Enter claims (one per line):", height=150)
+        if st.button("Analyze Claims"):
+            claims = [line.strip() for line in batch_text.splitlines() if line.strip()]
+            if claims and classifier:
+                with st.spinner(f"Analyzing {len(claims)} claims..."):
+                    results = analyze_claims(claims, background)
+                with timed("render"):
+                    display_results_table(results)
+            elif not claims:
+                st.warning("Please enter at least one claim.")
+            else:
+                st.error("Model not loaded. Please refresh the page.")
+
+    # Ingredients analysis
+    with st.expander("🧪 Product Ingredients Analysis"):
+        st.markdown("Check an ingredient list against our sustainability knowledge base. Ingredients it doesn't know, or vague ones, are scored by the AI model.")
         ingredients_text = st.text_area(
-            "Enter product ingredients (feature under development):",
+            "Enter product ingredients:",
             height=80,
-            placeholder="e.g., Water, Organic Aloe Vera, Sustainable Palm Oil...",
-            disabled=True
+            placeholder="e.g., Water, Organic Aloe Vera, Sustainable Palm Oil..."
         )
-        st.button("Analyze Ingredients", disabled=True)
+        if st.button("Analyze Ingredients"):
+            if ingredients_text.strip():
+                display_ingredients(analyze_ingredients(ingredients_text, background))
+            else:
+                st.warning("Please enter an ingredient list to analyze.")
+
+    # Sustainability report analysis
+    with st.expander("📄 Company Sustainability Report Analysis"):
+        st.markdown("Upload a sustainability report to score every claim it makes, section by section. PDFs are processed locally.")
+        report_file = st.file_uploader("Upload a report (PDF or text):", type=["pdf", "txt"])
+        report_text = st.text_area("Or paste the report text:", height=150)
+        if st.button("Analyze Report"):
+            if report_file is not None:
+                if report_file.name.lower().endswith(".pdf"):
+                    sections = pdf_sections(report_file)
+                else:
+                    sections = text_sections(report_file.getvalue().decode("utf-8", errors="ignore"))
+            elif report_text.strip():
+                sections = text_sections(report_text)
+            else:
+                sections = None
+                st.warning("Please upload a report or paste its text.")
+            if sections is not None:
+                if classifier:
+                    display_report(sections, background)
+                else:
+                    st.error("Model not loaded. Please refresh the page.")
+
+    # Latency and cache metrics for operators
+    if os.environ.get("GREENWASH_SHOW_METRICS"):
+        with st.expander("⏱️ Performance Metrics"):
+            st.code(render(), language="text")
 
     # About Us section
     st.markdown('''
@@ -0,0 +1,175 @@
+"""
+Self-contained, pre-warmed model artifacts for fast cold starts.
+
+`build_artifact` resolves a model once (hub download, tokenizer, weights)
+and writes everything a replica needs into one local directory: the
+tokenizer, the config, the weights as safetensors that load by memory
+map, optional ONNX graphs, and a manifest. `load_artifact` starts a
+scorer from that directory without any network lookup, and `Readiness`
+tracks loading and the warm-up batch so a health check can tell when a
+replica is ready to serve.
+
+Usage:
+    python artifact.py ./artifact --model typeform/distilbert-base-uncased-mnli --onnx --int8
+    GREENWASH_ARTIFACT=./artifact streamlit run app.py
+    python service.py --artifact ./artifact
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from engine import (
+    BACKENDS,
+    DEFAULT_MODEL,
+    LABEL_HASH,
+    ClaimScorer,
+)
+from metrics import timed
+
+DEFAULT_ARTIFACT_DIR = os.environ.get("GREENWASH_ARTIFACT")
+MANIFEST = "manifest.json"
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+# Short and long claims, so warm-up touches the kernels of several sequence lengths
+WARMUP_CLAIMS = [
+    "Eco-friendly.",
+    "Our product is eco-friendly and good for the environment.",
+    "We use 100% certified organic cotton sourced from fair-trade farms with verified supply chain "
+    "transparency, and our factories run on renewable energy audited by an independent third party.",
+]
+
+
+def build_artifact(out_dir, model=DEFAULT_MODEL, onnx=False, int8=False):
+    """Write tokenizer, config, safetensors weights and optional ONNX graphs to out_dir"""
+    import transformers
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    AutoTokenizer.from_pretrained(model).save_pretrained(out_dir)
+    AutoModelForSequenceClassification.from_pretrained(model).save_pretrained(out_dir, safe_serialization=True)
+    backends = ["torch"]
+    if onnx or int8:
+        from backends import export_onnx, quantize_int8
+
+        # Export from the local copy so the model is only downloaded once
+        export_onnx(out_dir, out_dir)
+        backends.append("onnx")
+        if int8:
+            quantize_int8(out_dir)
+            backends.append("onnx-int8")
+    manifest = {
+        "model": model,
+        "backends": backends,
+        "label_hash": LABEL_HASH,
+        "transformers": transformers.__version__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def load_artifact(path, cache=None, backend="torch", **options):
+    """Load a ClaimScorer from a built artifact, using only local files"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    manifest = read_manifest(path)
+    if manifest.get("label_hash") != LABEL_HASH:
+        raise ValueError(
+            f"Artifact {path!r} was built for label set {manifest.get('label_hash')}, but the running "
+            f"labels hash to {LABEL_HASH}; rebuild it with artifact.py"
+        )
+    if backend not in manifest["backends"]:
+        raise ValueError(f"Artifact {path!r} has no {backend!r} graph; rebuild it with --onnx/--int8")
+    with timed("load"):
+        from transformers import AutoConfig, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        if backend == "torch":
+            from workers import load_mapped_model
+
+            model = load_mapped_model(path)
+            model_id = manifest["model"]
+        else:
+            from backends import OnnxSequenceClassifier
+
+            config = AutoConfig.from_pretrained(path, local_files_only=True)
+            config.name_or_path = manifest["model"]
+            model = OnnxSequenceClassifier(os.path.join(path, ONNX_FILES[backend]), config)
+            # Same id as load_scorer, so artifact and hub replicas share cached scores
+            model_id = f"{manifest['model']}@{backend}"
+        return ClaimScorer(model, tokenizer, cache=cache, model_id=model_id, **options)
+
+
+def warm_up(scorer, claims=WARMUP_CLAIMS):
+    """Run one uncached batch so the first real request does not hit cold kernels"""
+    with timed("warmup"):
+        scorer.run_batch(claims)
+
+
+class Readiness:
+    """Startup state of a replica: starting -> loading -> warming -> ready, or failed"""
+
+    def __init__(self):
+        self.state = "starting"
+        self.error = None
+        self.scorer = None
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def set_state(self, state):
+        with self.lock:
+            self.state = state
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def run(self, load, warm=True):
+        """Call load() for a scorer, warm it up, and return it once ready"""
+        try:
+            self.set_state("loading")
+            start = time.perf_counter()
+            scorer = load()
+            self.timings["load_seconds"] = round(time.perf_counter() - start, 3)
+            if warm:
+                self.set_state("warming")
+                start = time.perf_counter()
+                warm_up(scorer)
+                self.timings["warmup_seconds"] = round(time.perf_counter() - start, 3)
+            self.scorer = scorer
+            self.set_state("ready")
+            return scorer
+        except Exception as e:
+            self.error = str(e)
+            self.set_state("failed")
+            raise
+
+    def to_dict(self):
+        return {"state": self.state, "error": self.error, **self.timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a self-contained model artifact for fast cold starts")
+    parser.add_argument("out_dir", help="directory to write the artifact to")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--onnx", action="store_true", help="also export an ONNX graph")
+    parser.add_argument("--int8", action="store_true", help="also write an int8-quantized ONNX graph")
+    args = parser.parse_args()
+
+    manifest = build_artifact(args.out_dir, args.model, onnx=args.onnx, int8=args.int8)
+    readiness = Readiness()
+    readiness.run(lambda: load_artifact(args.out_dir))
+    print(f"Built {args.out_dir} for {manifest['model']} ({', '.join(manifest['backends'])})")
+    print(f"Cold start from artifact: {readiness.timings}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+ONNX Runtime inference backend for the NLI scorer.
+
+The MNLI model is exported to ONNX once and cached on disk, optionally
+with a dynamically quantized int8 copy. `OnnxSequenceClassifier` mimics
+the parts of a PyTorch model that ClaimScorer uses, so the
+result/detailed_result dicts are built exactly as with the torch backend.
+"""
+import os
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+from transformers.modeling_outputs import SequenceClassifierOutput
+
+from engine import candidate_labels
+
+DEFAULT_ONNX_DIR = os.environ.get(
+    "GREENWASH_ONNX_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "greenwash", "onnx"),
+)
+
+
+class OnnxSequenceClassifier:
+    """ONNX Runtime session behind the interface of a transformers classifier"""
+
+    def __init__(self, path, config, threads=None):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.path = path
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.config = config
+        self.device = torch.device("cpu")
+
+    def __call__(self, **inputs):
+        feeds = {name: tensor.cpu().numpy() for name, tensor in inputs.items() if name in self.input_names}
+        logits = self.session.run(["logits"], feeds)[0]
+        return SequenceClassifierOutput(logits=torch.from_numpy(logits))
+
+
+def export_dir(model, root=DEFAULT_ONNX_DIR):
+    """Directory holding the exported graphs, tokenizer and config of a model"""
+    return os.path.join(root, model.replace("/", "--"))
+
+
+def export_onnx(model, out_dir):
+    """Export a sequence-classification model to out_dir/model.onnx"""
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    torch_model = AutoModelForSequenceClassification.from_pretrained(model).eval()
+    os.makedirs(out_dir, exist_ok=True)
+    sample = tokenizer("claim", "This example is a label.", return_tensors="pt")
+    input_names = [name for name in tokenizer.model_input_names if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    with torch.inference_mode():
+        torch.onnx.export(
+            torch_model,
+            ({name: sample[name] for name in input_names},),
+            os.path.join(out_dir, "model.onnx"),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(out_dir)
+    torch_model.config.save_pretrained(out_dir)
+
+
+def quantize_int8(out_dir):
+    """Write a dynamically quantized int8 copy next to model.onnx"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        os.path.join(out_dir, "model.onnx"),
+        os.path.join(out_dir, "model.int8.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def load_onnx_model(model, quantize=False, root=DEFAULT_ONNX_DIR, threads=None):
+    """Return (OnnxSequenceClassifier, tokenizer), exporting on first use"""
+    out_dir = export_dir(model, root)
+    if not os.path.exists(os.path.join(out_dir, "model.onnx")):
+        export_onnx(model, out_dir)
+    filename = "model.onnx"
+    if quantize:
+        filename = "model.int8.onnx"
+        if not os.path.exists(os.path.join(out_dir, filename)):
+            quantize_int8(out_dir)
+    config = AutoConfig.from_pretrained(out_dir)
+    config.name_or_path = model
+    tokenizer = AutoTokenizer.from_pretrained(out_dir)
+    return OnnxSequenceClassifier(os.path.join(out_dir, filename), config, threads), tokenizer
+
+
+def accuracy_drift(reference, candidate, claims):
+    """Compare two ClaimScorers on the same claims
+
+    Returns the largest and mean absolute score difference and how often
+    the top-level verdict and the top detailed indicator agree.
+    """
+    expected = reference.run_batch(claims)
+    actual = candidate.run_batch(claims)
+    n_main = len(candidate_labels)
+    diff = np.abs(expected - actual)
+    return {
+        "claims": len(claims),
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "verdict_agreement": float(np.mean(expected[:, :n_main].argmax(1) == actual[:, :n_main].argmax(1))),
+        "indicator_agreement": float(np.mean(expected[:, n_main:].argmax(1) == actual[:, n_main:].argmax(1))),
+    }
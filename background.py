@@ -0,0 +1,117 @@
+"""
+Shared background scorer for the Streamlit app.
+
+Every session submits claims to one model thread instead of running the
+model on its own script thread, including batch and report analysis.
+Claims submitted at about the same time are scored together in
+micro-batches, and cheap top-level verdicts are served before detailed
+indicators, so each session can render its verdict first and stream the
+indicators in afterwards. The scorer keeps the verdict rows, so the
+follow-up request only runs the indicator pairs.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from engine import DEFAULT_BATCH_SIZE, DEFAULT_WINDOW, chunked, split_results
+from metrics import MICROBATCH_CLAIMS, QUEUE_DEPTH
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 10
+# Lower runs first: verdict-only requests jump ahead of full scoring, and
+# interactive requests ahead of bulk batch and report work
+PRIORITIES = {"none": 0, "hierarchical": 1, "all": 1}
+BULK_PRIORITY = 2
+
+
+class BackgroundScorer:
+    """Model thread that micro-batches claims submitted from many sessions"""
+
+    def __init__(self, scorer, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_size = batch_size
+        self.queue = queue.PriorityQueue()
+        self.order = itertools.count()
+        self.thread = threading.Thread(target=self.run, name="background-scorer", daemon=True)
+        self.thread.start()
+
+    def submit(self, text, detail_mode="all", bulk=False, raw=False):
+        """Queue one claim; the Future resolves to (result, detailed_result), or its score row if raw"""
+        future = Future()
+        priority = PRIORITIES[detail_mode] + (BULK_PRIORITY if bulk else 0)
+        self.queue.put((priority, next(self.order), text, (detail_mode, raw), future))
+        QUEUE_DEPTH.set(self.queue.qsize())
+        return future
+
+    def analyze(self, text):
+        """Queue a claim twice: (verdict future, full result future)
+
+        The verdict-only request runs first, so the top-level result is
+        available while the detailed indicators are still being scored.
+        """
+        return self.submit(text, "none"), self.submit(text, "all")
+
+    def score_batch(self, texts, batch_size=None, detail_mode=None):
+        """Score many claims on the model thread behind interactive requests; a drop-in for score_batch"""
+        futures = [self.submit(text, detail_mode or "all", bulk=True, raw=True) for text in texts]
+        if not futures:
+            return np.empty((0, len(self.scorer.labels)), dtype=np.float32)
+        return np.stack([future.result() for future in futures])
+
+    def split_results(self, text, scores):
+        return split_results(text, scores)
+
+    def analyze_many(self, texts, batch_size=None, window=DEFAULT_WINDOW, detail_mode=None):
+        """Yield (result, detailed_result) for every claim, in input order, scored as bulk work"""
+        for window_texts in chunked(texts, window):
+            futures = [self.submit(text, detail_mode or "all", bulk=True) for text in window_texts]
+            for future in futures:
+                yield future.result()
+
+    def next_batch(self):
+        """Wait for a claim, then gather more of the same mode until full or the window closes"""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        held = []
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            (batch if item[3] == batch[0][3] else held).append(item)
+        # Requests of another mode wait for the next batch, keeping their place
+        for item in held:
+            self.queue.put(item)
+        QUEUE_DEPTH.set(self.queue.qsize())
+        return batch
+
+    def run(self):
+        while True:
+            batch = [item for item in self.next_batch() if item[4].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [item[2] for item in batch]
+            detail_mode, raw = batch[0][3]
+            MICROBATCH_CLAIMS.observe(len(batch))
+            try:
+                if raw:
+                    results = self.scorer.score_batch(texts, self.batch_size, detail_mode)
+                else:
+                    results = list(self.scorer.analyze_many(texts, self.batch_size, detail_mode=detail_mode))
+            except Exception as e:
+                for item in batch:
+                    item[4].set_exception(e)
+                continue
+            for item, result in zip(batch, results):
+                item[4].set_result(result)
@@ -0,0 +1,376 @@
+"""
+Command-line batch scorer for large CSV/JSONL claim files.
+
+Claims are streamed from the input, scored chunk by chunk with the same
+label set as the Streamlit app, and written to the output as they finish.
+A checkpoint records how far the job got, so a killed run resumes from
+the last checkpoint instead of starting over.
+
+Usage:
+    python batch_score.py claims.csv scores.jsonl --column claim --id-column sku
+
+With --history, claims are tracked per id and only new, changed or stale
+ones are re-scored (see history.py). With --dedup-threshold, near-duplicate
+claims are clustered and only one claim per cluster is scored (see dedup.py).
+With --ensemble, more models score every claim alongside --model and their
+scores are fused (see ensemble.py); --calibration-csv fits the members'
+temperatures on reference verdicts first. With --tiered, confidently
+classified claims are scored by embedding similarity and only the rest by
+the NLI model (see tiered.py).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from cache import DEFAULT_CACHE_PATH, ResultCache
+from engine import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_DETAIL_MARGIN,
+    DEFAULT_MIN_CONFIDENCE,
+    DEFAULT_MODEL,
+    DETAIL_MODES,
+    candidate_labels,
+    chunked,
+    detailed_labels,
+    load_scorer,
+)
+import metrics
+
+OUTPUT_FIELDS = ["row", "id", "claim", "prediction", "confidence"] + candidate_labels + detailed_labels
+
+
+def detect_format(path):
+    """Return 'csv' or 'jsonl' based on the file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Cannot infer format of {path}; pass --input-format/--output-format")
+
+
+def read_claims(path, fmt, column, id_column=None):
+    """Stream (row, id, claim) tuples from a CSV or JSONL file"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for row, record in enumerate(records):
+            if column not in record:
+                raise KeyError(f"Row {row} has no '{column}' field")
+            claim_id = record.get(id_column) if id_column else None
+            yield row, claim_id, str(record[column] or "")
+
+
+def to_record(row, claim_id, result, detailed_result):
+    """Flatten a scored claim into one output row"""
+    record = {
+        "row": row,
+        "id": claim_id,
+        "claim": result["sequence"],
+        "prediction": result["labels"][0],
+        "confidence": round(result["scores"][0], 6),
+    }
+    for r in (result, detailed_result):
+        for label, score in zip(r["labels"], r["scores"]):
+            record[label] = round(score, 6)
+    return record
+
+
+class ResultWriter:
+    """Append scored records to a CSV or JSONL file"""
+
+    def __init__(self, path, fmt, offset=0, fields=OUTPUT_FIELDS):
+        self.fmt = fmt
+        fresh = offset == 0
+        if not fresh:
+            # Drop anything written after the last checkpoint
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        self.file = open(path, "w" if fresh else "a", newline="", encoding="utf-8")
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.file, fieldnames=fields)
+            if fresh:
+                self.csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == "csv":
+            self.csv.writerow(record)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        """Flush buffered rows and return the file size in bytes"""
+        self.file.flush()
+        return os.fstat(self.file.fileno()).st_size
+
+    def sync(self):
+        """Force written rows to disk before a checkpoint references them"""
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def load_checkpoint(path, input_path, output_path):
+    """Return the saved checkpoint for this job, or None to start fresh"""
+    if not os.path.exists(path) or not os.path.exists(output_path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint.get('input')}; use --restart")
+    return checkpoint
+
+
+def save_checkpoint(path, input_path, rows_done, output_bytes):
+    """Atomically record progress so an interrupted job can resume"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "input": os.path.abspath(input_path),
+            "rows_done": rows_done,
+            "output_bytes": output_bytes,
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def run(args):
+    """Score every claim in args.input and write results to args.output"""
+    input_format = args.input_format or detect_format(args.input)
+    output_format = args.output_format or detect_format(args.output)
+    checkpoint_path = args.checkpoint or args.output + ".ckpt"
+
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path, args.input, args.output)
+    rows_done = checkpoint["rows_done"] if checkpoint else 0
+    if checkpoint:
+        print(f"Resuming after {rows_done} rows from {checkpoint_path}", file=sys.stderr)
+
+    print(f"Loading model {args.model}...", file=sys.stderr)
+    if args.workers > 1:
+        # Worker processes share one memory-mapped copy of the weights
+        from workers import WorkerPool
+
+        cache = None
+        pool = scorer = WorkerPool(args.model, workers=args.workers, detail_mode=args.detail_mode,
+                                   min_confidence=args.min_confidence, detail_margin=args.detail_margin)
+    else:
+        cache = None if args.no_cache else ResultCache(args.cache)
+        scorer = load_scorer(args.model, cache=cache, backend=args.backend, detail_mode=args.detail_mode,
+                             min_confidence=args.min_confidence, detail_margin=args.detail_margin)
+    ensemble = None
+    if args.ensemble:
+        from ensemble import EnsembleScorer, read_reference
+
+        members = [scorer] + [
+            load_scorer(model, cache=cache, backend=args.backend, detail_mode=args.detail_mode,
+                        min_confidence=args.min_confidence, detail_margin=args.detail_margin)
+            for model in args.ensemble
+        ]
+        ensemble = scorer = EnsembleScorer(members, args.ensemble_weights, args.ensemble_method,
+                                           args.ensemble_temperatures)
+        if args.calibration_csv:
+            temperatures = ensemble.calibrate(*read_reference(args.calibration_csv), batch_size=args.batch_size)
+            print(f"Ensemble temperatures: {' '.join(f'{t:g}' for t in temperatures)} "
+                  f"(reuse with --ensemble-temperatures)", file=sys.stderr)
+    # Per-row output columns that only a wrapper knows, looked up by claim after scoring
+    annotators = {}
+    if ensemble is not None:
+        annotators["agreement"] = lambda texts: [
+            None if np.isnan(value) else round(float(value), 6) for value in ensemble.agreement_of(texts)
+        ]
+    if args.tiered:
+        from tiered import DEFAULT_EMBEDDING_MODEL, DEFAULT_MARGIN, SentenceEncoder, TieredScorer
+
+        scorer = TieredScorer(scorer, SentenceEncoder(args.embedding_model or DEFAULT_EMBEDDING_MODEL),
+                              margin=DEFAULT_MARGIN if args.tier_margin is None else args.tier_margin)
+        annotators["tier"] = scorer.tier_of
+    if args.rules:
+        # Obvious buzzword claims are decided by keyword rules without a model call
+        from rules import RuleScorer
+
+        scorer = RuleScorer(scorer)
+        annotators["rule"] = scorer.rule_of
+
+    history = None
+    statuses = Counter()
+    if args.history:
+        from history import ClaimHistory, rescore
+
+        history = ClaimHistory(args.history)
+    dedup = None
+    model_calls = 0
+    if args.dedup_threshold:
+        from dedup import DEFAULT_MAX_CLUSTERS, NearDuplicateIndex, score_deduplicated
+
+        max_clusters = DEFAULT_MAX_CLUSTERS if args.dedup_max_clusters is None else args.dedup_max_clusters
+        dedup = NearDuplicateIndex(args.dedup_threshold, max_clusters=max_clusters)
+
+    claims = read_claims(args.input, input_format, args.column, args.id_column)
+    committed = checkpoint["output_bytes"] if checkpoint else 0
+    fields = OUTPUT_FIELDS + ["cluster"] if dedup is not None else OUTPUT_FIELDS
+    fields = fields + list(annotators)
+    writer = ResultWriter(args.output, output_format, committed, fields)
+    start = time.perf_counter()
+    scored = 0
+    last_checkpoint = rows_done
+    try:
+        for chunk in chunked(claims, args.chunk_size):
+            # Skip rows already committed by a previous run
+            chunk = [item for item in chunk if item[0] >= rows_done]
+            if not chunk:
+                continue
+            if history is not None:
+                scores, chunk_statuses = rescore(
+                    history, scorer, [(str(claim_id), claim) for _, claim_id, claim in chunk],
+                    args.batch_size, args.detail_mode,
+                )
+                statuses.update(chunk_statuses)
+            elif dedup is not None:
+                scores, clusters, scored_claims = score_deduplicated(
+                    dedup, scorer, [claim for _, _, claim in chunk], args.batch_size, args.detail_mode,
+                )
+                model_calls += scored_claims
+            else:
+                scores = scorer.score_batch([claim for _, _, claim in chunk], args.batch_size, args.detail_mode)
+            # Read back from the wrappers, so they survive --rules, --history and --dedup-threshold;
+            # empty for claims the models did not score in this run (rule verdicts, unchanged history)
+            texts = [claim for _, _, claim in chunk]
+            annotations = {column: annotate(texts) for column, annotate in annotators.items()}
+            if dedup is not None:
+                for i, cluster in enumerate(clusters):
+                    # Annotations of the cluster's representative, for members scored through it
+                    known = dedup.annotations.setdefault(cluster, {})
+                    for column, values in annotations.items():
+                        if values[i] is not None:
+                            known.setdefault(column, values[i])
+                        values[i] = known.get(column)
+            for i, ((row, claim_id, claim), row_scores) in enumerate(zip(chunk, scores)):
+                result, detailed_result = scorer.split_results(claim, row_scores)
+                record = to_record(row, claim_id, result, detailed_result)
+                if dedup is not None:
+                    record["cluster"] = clusters[i]
+                for column, values in annotations.items():
+                    record[column] = values[i]
+                writer.write(record)
+            rows_done = chunk[-1][0] + 1
+            committed = writer.flush()
+            scored += len(chunk)
+            if rows_done - last_checkpoint >= args.checkpoint_every:
+                writer.sync()
+                save_checkpoint(checkpoint_path, args.input, rows_done, committed)
+                last_checkpoint = rows_done
+                rate = scored / (time.perf_counter() - start)
+                print(f"{rows_done} rows done ({rate:.1f} claims/sec)", file=sys.stderr)
+    finally:
+        # Only whole chunks count; a partially written chunk is truncated on resume
+        writer.sync()
+        save_checkpoint(checkpoint_path, args.input, rows_done, committed)
+        writer.close()
+        if args.workers > 1:
+            pool.close()
+        if ensemble is not None:
+            ensemble.close()
+        if history is not None:
+            history.close()
+
+    os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {scored} claims in {elapsed:.1f}s -> {args.output}", file=sys.stderr)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}", file=sys.stderr)
+    if history is not None:
+        print(f"History: {dict(statuses)}", file=sys.stderr)
+    if args.rules:
+        print(f"Rules: {scorer.short_circuited} claims decided by rules, {scorer.forwarded} sent to the model",
+              file=sys.stderr)
+    if dedup is not None:
+        print(f"Dedup: {model_calls} of {scored} claims scored as cluster representatives, "
+              f"{dedup.stats()['clusters']} clusters", file=sys.stderr)
+    if args.metrics_out:
+        metrics.dump(args.metrics_out)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score sustainability claims from a CSV or JSONL file")
+    parser.add_argument("input", help="CSV or JSONL file with one claim per row")
+    parser.add_argument("output", help="CSV or JSONL file to write scores to")
+    parser.add_argument("--column", default="claim", help="field holding the claim text (default: claim)")
+    parser.add_argument("--id-column", help="field copied to the output as the claim id")
+    parser.add_argument("--input-format", choices=["csv", "jsonl"], help="override format detection")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="override format detection")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="NLI model to score with")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="model worker processes; above 1 the torch backend runs without the cache")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="inference backend (default: $GREENWASH_BACKEND or torch)")
+    parser.add_argument("--detail-mode", choices=DETAIL_MODES, default="all",
+                        help="score all indicators, only those of leading categories, or none")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help="hierarchical mode: expand categories scoring at least this")
+    parser.add_argument("--detail-margin", type=float, default=DEFAULT_DETAIL_MARGIN,
+                        help="hierarchical mode: expand categories within this of the winner")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="(claim, label) pairs per forward pass")
+    parser.add_argument("--chunk-size", type=int, default=1024,
+                        help="claims read, length-bucketed and written together")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite score cache shared with the app")
+    parser.add_argument("--no-cache", action="store_true", help="always run the model")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.ckpt)")
+    parser.add_argument("--checkpoint-every", type=int, default=10000,
+                        help="rows between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start over")
+    parser.add_argument("--history", help="claim history SQLite file; re-score only new, changed or stale "
+                        "claims (requires --id-column)")
+    parser.add_argument("--rules", action="store_true",
+                        help="decide obvious buzzword claims with keyword rules instead of the model")
+    parser.add_argument("--dedup-threshold", type=float, default=0,
+                        help="score one claim per cluster of near-duplicates at this MinHash similarity, "
+                        "e.g. 0.7 (cluster ids are per run)")
+    parser.add_argument("--dedup-max-clusters", type=int,
+                        help="clusters remembered across chunks, about 3 KB each (default: 100000, ~300 MB); "
+                        "the least recently matched are forgotten first, 0 keeps all")
+    parser.add_argument("--ensemble", nargs="+", metavar="MODEL",
+                        help="also score with these models and fuse their scores with --model's")
+    parser.add_argument("--ensemble-method", choices=["average", "vote"], default="average",
+                        help="weighted score averaging or confidence-weighted voting on the verdict")
+    parser.add_argument("--ensemble-weights", type=float, nargs="+",
+                        help="one weight per ensemble member: --model, then each --ensemble model")
+    parser.add_argument("--ensemble-temperatures", type=float, nargs="+",
+                        help="one calibration temperature per ensemble member, as printed by --calibration-csv")
+    parser.add_argument("--calibration-csv",
+                        help="CSV of reference verdicts (claim, label columns) to fit the ensemble's temperatures on")
+    parser.add_argument("--tiered", action="store_true",
+                        help="score clear-cut claims by embedding similarity and only uncertain ones with NLI; "
+                        "adds a tier column, since the two tiers' scores are on different scales")
+    parser.add_argument("--embedding-model",
+                        help="--tiered: sentence embedding model of the fast tier (default: all-MiniLM-L6-v2)")
+    parser.add_argument("--tier-margin", type=float,
+                        help="--tiered: send claims whose top-two categories are closer than this to NLI "
+                        "(default: 0.2)")
+    parser.add_argument("--metrics-out", help="write per-stage latency and cache metrics to this file")
+    args = parser.parse_args(argv)
+    if args.history and not args.id_column:
+        parser.error("--history needs --id-column to track claims per source")
+    if args.history and args.dedup_threshold:
+        parser.error("--history and --dedup-threshold cannot be combined")
+    if args.workers > 1 and args.backend != "torch":
+        parser.error("--workers memory-maps torch weights and cannot be combined with an ONNX --backend")
+    if args.ensemble and args.workers > 1:
+        parser.error("--ensemble runs its models in-process and cannot be combined with --workers")
+    if (args.ensemble_temperatures or args.calibration_csv) and not args.ensemble:
+        parser.error("--ensemble-temperatures and --calibration-csv need --ensemble")
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1 @@
+"""Benchmarks for the scoring engine. Run from the repo root, e.g. `python -m benchmarks.tiered`."""
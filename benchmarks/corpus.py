@@ -0,0 +1,77 @@
+"""
+Fixed claim corpus shared by the benchmarks.
+"""
+import random
+
+# Example claims offered in the Streamlit app
+APP_EXAMPLES = [
+    "Our product is eco-friendly and good for the environment.",
+    "We use 100% certified organic cotton sourced from fair-trade farms with verified supply chain transparency.",
+    "This amazing natural product will revolutionize your life!",
+    "Our revolutionary green technology reduces carbon emissions without any compromise on performance.",
+    "Made with sustainable materials that protect the planet for future generations."
+]
+
+# Test claims from demo.py
+DEMO_CLAIMS = [
+    "Our product is eco-friendly and good for the environment.",
+    "We use 100% certified organic cotton sourced from fair-trade farms with verified supply chain transparency.",
+    "This item is natural and green.",
+    "Our manufacturing process is powered by 100% renewable energy with third-party verified carbon offsets."
+]
+
+PRODUCTS = ["shampoo", "T-shirt", "water bottle", "detergent", "sneaker", "coffee pod", "phone case", "candle"]
+
+
+def seed_claims():
+    """Distinct claims from the app examples and the demo"""
+    return list(dict.fromkeys(APP_EXAMPLES + DEMO_CLAIMS))
+
+
+def claim_corpus(size, seed=0):
+    """Deterministic list of `size` claims built from the seed claims
+
+    Seed claims are varied by product name and casing so the corpus looks
+    like catalogue copy rather than one sentence repeated.
+    """
+    rng = random.Random(seed)
+    base = seed_claims()
+    claims = []
+    for i in range(size):
+        claim = base[i % len(base)]
+        claim = f"{rng.choice(PRODUCTS).capitalize()}: {claim}"
+        if rng.random() < 0.3:
+            claim = claim.lower()
+        claims.append(claim)
+    return claims
+
+# Clauses appended to seed claims to stretch them to a target length
+FILLERS = [
+    "packaged in fully recyclable cardboard",
+    "made in a facility powered by solar energy",
+    "with a carbon footprint verified by an independent auditor",
+    "free from harmful chemicals and microplastics",
+    "shipped with carbon neutral delivery",
+    "sourced from responsibly managed forests",
+    "designed to last for years and easy to repair",
+    "certified by leading environmental organisations",
+]
+
+# Target claim lengths in words for the length sweep
+SWEEP_LENGTHS = (8, 16, 32, 64, 128)
+
+
+def length_sweep(lengths=SWEEP_LENGTHS, per_length=20, seed=0):
+    """Deterministic {length: claims} with claims of exactly `length` words"""
+    rng = random.Random(seed)
+    base = seed_claims()
+    sweep = {}
+    for length in lengths:
+        claims = []
+        for i in range(per_length):
+            words = base[i % len(base)].rstrip(".").split()
+            while len(words) < length:
+                words += ["and"] + rng.choice(FILLERS).split()
+            claims.append(" ".join(words[:length]) + ".")
+        sweep[length] = claims
+    return sweep
@@ -0,0 +1,39 @@
+"""
+Accuracy-drift check of an alternative backend against the torch fp32 model.
+
+Scores the app and demo example claims with both backends and fails
+(exit status 1) if the scores drift past the tolerance or any top-level
+verdict changes.
+
+Usage:
+    python -m benchmarks.drift --backend onnx-int8 --tolerance 0.05
+"""
+import argparse
+import json
+import sys
+
+from backends import accuracy_drift
+from benchmarks.corpus import seed_claims
+from engine import BACKENDS, DEFAULT_MODEL, load_scorer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "torch"], default="onnx-int8")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="largest allowed absolute score difference")
+    args = parser.parse_args()
+
+    reference = load_scorer(args.model, backend="torch")
+    candidate = load_scorer(args.model, backend=args.backend)
+    report = accuracy_drift(reference, candidate, seed_claims())
+    print(json.dumps(report, indent=2))
+
+    if report["max_abs_diff"] > args.tolerance or report["verdict_agreement"] < 1.0:
+        print(f"❌ {args.backend} drifts from torch fp32 beyond tolerance {args.tolerance}")
+        sys.exit(1)
+    print(f"✅ {args.backend} matches torch fp32 within {args.tolerance}")
+
+
+if __name__ == "__main__":
+    main()
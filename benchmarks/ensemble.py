@@ -0,0 +1,80 @@
+"""
+Latency of an ensemble against its slowest member.
+
+Times each model alone on the benchmark corpus, then the ensemble with
+members run concurrently and one after another, and reports how often
+the models agree on the verdict. The cache is bypassed so every run
+does the same work.
+
+Usage:
+    python -m benchmarks.ensemble --models typeform/distilbert-base-uncased-mnli facebook/bart-large-mnli
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.corpus import claim_corpus
+from engine import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, DEFAULT_MODEL, load_scorer
+from ensemble import FUSION_METHODS, EnsembleScorer
+
+
+class Uncached:
+    """Member that always runs the model, so repeated timings are comparable"""
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+        self.model_id = scorer.model_id
+        self.label_hash = scorer.label_hash
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        return self.scorer.run_batch(texts, batch_size, detail_mode or self.scorer.detail_mode)
+
+
+def best_of(repeats, run):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL, "facebook/bart-large-mnli"])
+    parser.add_argument("--backend", default=DEFAULT_BACKEND)
+    parser.add_argument("--method", choices=FUSION_METHODS, default="average")
+    parser.add_argument("--claims", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    claims = claim_corpus(args.claims)
+    members = [Uncached(load_scorer(model, backend=args.backend)) for model in args.models]
+    for member in members:
+        member.score_batch(claims[:8], args.batch_size)
+
+    print(f"Claims:                {len(claims)}")
+    singles = []
+    for member in members:
+        seconds = best_of(args.repeats, lambda: member.score_batch(claims, args.batch_size))
+        singles.append(seconds)
+        print(f"{member.model_id:<40} {seconds:8.2f}s")
+    concurrent = EnsembleScorer(members, method=args.method)
+    sequential = EnsembleScorer(members, method=args.method, concurrent=False)
+    concurrent_seconds = best_of(args.repeats, lambda: concurrent.score_batch(claims, args.batch_size))
+    sequential_seconds = best_of(args.repeats, lambda: sequential.score_batch(claims, args.batch_size))
+    concurrent.close()
+    print(f"{'ensemble (concurrent)':<40} {concurrent_seconds:8.2f}s  "
+          f"{concurrent_seconds / max(singles):.2f}x slowest member")
+    print(f"{'ensemble (sequential)':<40} {sequential_seconds:8.2f}s  "
+          f"{sequential_seconds / max(singles):.2f}x slowest member")
+
+    _, agreement, _ = sequential.score_batch_with_agreement(claims, args.batch_size)
+    print(f"Mean agreement:        {agreement.mean():.1%}")
+    print(f"Unanimous verdicts:    {np.mean(agreement == 1):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Import-time benchmark: what a worker pays to get at the scoring code.
+
+Each import runs in a fresh interpreter so module caches don't hide the
+cost. `app` is the Streamlit UI module, which pulls in Streamlit, Plotly
+and the page setup; `engine` is what workers import instead.
+
+Usage:
+    python -m benchmarks.import_time --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "engine": "import engine",
+    "engine + torch stack": "import engine, torch, transformers",
+    "app (Streamlit UI)": "import app",
+}
+
+
+def time_import(statement):
+    """Seconds taken by `statement` in a fresh Python process"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - start)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    medians = {}
+    for name, statement in TARGETS.items():
+        runs = [time_import(statement) for _ in range(args.repeat)]
+        medians[name] = statistics.median(runs)
+        print(f"{name:<24} {medians[name] * 1000:8.1f} ms (median of {args.repeat})")
+    saving = medians["app (Streamlit UI)"] - medians["engine"]
+    print(f"\nImporting engine instead of app saves {saving * 1000:.1f} ms per worker start")
+
+
+if __name__ == "__main__":
+    main()
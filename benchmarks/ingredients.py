@@ -0,0 +1,48 @@
+"""
+Throughput of the ingredient analyzer's knowledge-base path.
+
+Reports ingredient lists per second with knowledge-base lookups only,
+and the share of ingredients that would be sent to the classifier.
+
+Usage:
+    python -m benchmarks.ingredients --lists 10000
+"""
+import argparse
+import random
+import time
+
+from ingredients import KNOWLEDGE_BASE, analyze_ingredient_lists
+
+# Ingredients missing from the knowledge base, so some items need the classifier
+UNKNOWN = ["jojoba seed oil", "soy lecithin", "cetearyl alcohol", "sodium benzoate", "guar gum", "rosemary extract"]
+
+
+def ingredient_lists(size, items=15, seed=0):
+    """Deterministic comma-separated ingredient lists mixing known and unknown items"""
+    rng = random.Random(seed)
+    vocabulary = [term.title() for term in KNOWLEDGE_BASE] + [term.title() for term in UNKNOWN]
+    return [", ".join(rng.choice(vocabulary) for _ in range(items)) for _ in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lists", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=15, help="ingredients per list")
+    args = parser.parse_args()
+
+    lists = ingredient_lists(args.lists, args.items)
+    start = time.perf_counter()
+    analyses = analyze_ingredient_lists(lists)
+    elapsed = time.perf_counter() - start
+    items = [item for analysis in analyses for item in analysis["ingredients"]]
+    forwarded = sum(item["source"] == "unscored" for item in items)
+    distinct = len({item["normalized"] for item in items if item["source"] == "unscored"})
+
+    print(f"Lists:                 {len(lists)}")
+    print(f"Lists/sec:             {len(lists) / elapsed:10.1f}")
+    print(f"Ingredients/sec:       {len(items) / elapsed:10.1f}")
+    print(f"Sent to classifier:    {forwarded / len(items):10.1%} ({distinct} distinct)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Calibration report for the lexical pre-classifier.
+
+Shows how many claims each rule short-circuits and how often its verdict
+matches the reference: human labels from a CSV, or otherwise the NLI
+model's own top-level verdict on the benchmark corpus.
+
+Usage:
+    python -m benchmarks.rules --claims 1000
+    python -m benchmarks.rules --labels labeled.csv --column claim --label-column label --min-precision 0.9
+"""
+import argparse
+import csv
+import sys
+
+from benchmarks.corpus import claim_corpus, length_sweep
+from engine import DEFAULT_BATCH_SIZE, DEFAULT_MODEL, candidate_labels, load_scorer
+from rules import calibrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--claims", type=int, default=1000, help="corpus size when no --labels file is given")
+    parser.add_argument("--labels", help="CSV of claims with a human top-level label")
+    parser.add_argument("--column", default="claim")
+    parser.add_argument("--label-column", default="label")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="reference model when no labels are given")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--min-precision", type=float, help="exit 1 if overall precision is below this")
+    args = parser.parse_args()
+
+    if args.labels:
+        with open(args.labels, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        claims = [row[args.column] for row in rows]
+        reference = [row[args.label_column] for row in rows]
+        source = args.labels
+    else:
+        claims = claim_corpus(args.claims) + [c for group in length_sweep().values() for c in group]
+        scores = load_scorer(args.model).score_batch(claims, args.batch_size, detail_mode="none")
+        reference = [candidate_labels[i] for i in scores[:, :len(candidate_labels)].argmax(1)]
+        source = f"{args.model} verdicts"
+
+    report = calibrate(claims, reference)
+    print(f"Reference:        {source}")
+    print(f"Claims:           {report['claims']}")
+    print(f"Short-circuited:  {report['short_circuited']} ({report['coverage']:.1%})")
+    for name, rule in report["rules"].items():
+        precision = "n/a" if rule["precision"] is None else f"{rule['precision']:.1%}"
+        print(f"  {name:<18} -> {rule['verdict']:<22} fired {rule['fired']:>6} ({rule['coverage']:.1%})  "
+              f"precision {precision}")
+    overall = report["precision"]
+    print(f"Precision:        {'n/a' if overall is None else f'{overall:.1%}'}")
+    if args.min_precision is not None and overall is not None and overall < args.min_precision:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
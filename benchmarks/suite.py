@@ -0,0 +1,209 @@
+"""
+Reproducible latency, throughput and memory benchmark across models and backends.
+
+Every (model, backend) pair runs in a fresh process so model load time
+and peak RSS are not skewed by earlier runs. For each pair it reports:
+
+- model load time and peak RSS of the process
+- p50/p95/p99 single-claim latency of the app's analyze path
+- median latency over a synthetic claim-length sweep
+- claims/sec of run_batch at several batch sizes and in every detail mode
+
+Results are saved as JSON. Given a baseline file, any metric that got
+worse by more than --tolerance is printed and the exit code is 1, so CI
+can fail on regressions.
+
+Usage:
+    python -m benchmarks.suite --models typeform/distilbert-base-uncased-mnli facebook/bart-large-mnli \\
+        --backends torch onnx --out bench.json
+    python -m benchmarks.suite --baseline bench.json --out current.json
+    python -m benchmarks.suite --baseline bench.json --current current.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.corpus import SWEEP_LENGTHS, claim_corpus, length_sweep
+from engine import BACKENDS, DEFAULT_BACKEND, DEFAULT_MODEL, DETAIL_MODES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BATCH_SIZES = (32, 64, 128, 256, 512)
+DEFAULT_TOLERANCE = 0.15
+# Metrics where a larger value is a regression; everything else must not drop
+LOWER_IS_BETTER = ("load_seconds", "peak_rss_mb", "latency_ms", "length_latency_ms")
+
+
+def percentiles(values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+
+def latencies_ms(scorer, claims):
+    """Wall time of scorer.analyze per claim, in milliseconds"""
+    times = []
+    for claim in claims:
+        start = time.perf_counter()
+        scorer.analyze(claim)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def claims_per_sec(scorer, claims, batch_size, detail_mode="all"):
+    """Throughput of a full model run; run_batch skips the cache and the partial rows of earlier runs"""
+    start = time.perf_counter()
+    scorer.run_batch(claims, batch_size, detail_mode)
+    return round(len(claims) / (time.perf_counter() - start), 2)
+
+
+def run_config(model, backend, latency_claims, throughput_claims, batch_sizes, sweep_per_length, seed):
+    """Benchmark one (model, backend) pair; runs in its own process"""
+    from engine import load_scorer
+
+    start = time.perf_counter()
+    scorer = load_scorer(model, backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    # Warm up so one-off kernel initialization is not timed
+    latencies_ms(scorer, claim_corpus(4, seed + 1))
+
+    latency = percentiles(latencies_ms(scorer, claim_corpus(latency_claims, seed)))
+    sweep = length_sweep(per_length=sweep_per_length, seed=seed)
+    length_latency = {
+        str(length): round(float(np.median(latencies_ms(scorer, claims))), 3)
+        for length, claims in sweep.items()
+    }
+    corpus = claim_corpus(throughput_claims, seed)
+    throughput = {str(size): claims_per_sec(scorer, corpus, size) for size in batch_sizes}
+    modes = {mode: claims_per_sec(scorer, corpus, max(batch_sizes), mode) for mode in DETAIL_MODES}
+
+    return {
+        "model": model,
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "latency_ms": latency,
+        "length_latency_ms": length_latency,
+        "throughput": throughput,
+        "mode_throughput": modes,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def flatten(run):
+    """{metric path: value} for every numeric metric of one run"""
+    flat = {}
+    for key, value in run.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{k}": v for k, v in value.items()})
+        elif isinstance(value, (int, float)):
+            flat[key] = value
+    return flat
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """List the metrics of `current` that are worse than `baseline` by more than `tolerance`"""
+    previous = {(run["model"], run["backend"]): flatten(run) for run in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        before = previous.get((run["model"], run["backend"]))
+        if before is None:
+            continue
+        for metric, value in flatten(run).items():
+            if metric not in before or not before[metric]:
+                continue
+            change = value / before[metric] - 1
+            if metric.split(".")[0] not in LOWER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    f"{run['model']} [{run['backend']}] {metric}: {before[metric]} -> {value} ({change:+.1%} worse)"
+                )
+    return regressions
+
+
+def print_run(run):
+    latency = run["latency_ms"]
+    print(f"\n{run['model']} [{run['backend']}]")
+    print(f"  load:       {run['load_seconds']:.2f}s   peak RSS: {run['peak_rss_mb']:.0f} MiB")
+    print(f"  latency:    p50 {latency['p50']:.1f} ms  p95 {latency['p95']:.1f} ms  p99 {latency['p99']:.1f} ms")
+    print("  by length:  " + "  ".join(f"{n}w {ms:.1f} ms" for n, ms in run["length_latency_ms"].items()))
+    print("  claims/sec: " + "  ".join(f"bs{size} {rate:.1f}" for size, rate in run["throughput"].items()))
+    print("  modes:      " + "  ".join(f"{mode} {rate:.1f}" for mode, rate in run["mode_throughput"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=[DEFAULT_BACKEND])
+    parser.add_argument("--latency-claims", type=int, default=200, help="claims timed one at a time")
+    parser.add_argument("--throughput-claims", type=int, default=1000, help="claims per throughput run")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(DEFAULT_BATCH_SIZES),
+                        help="(claim, label) pairs per forward pass")
+    parser.add_argument("--sweep-per-length", type=int, default=20,
+                        help=f"claims per length in the {'/'.join(map(str, SWEEP_LENGTHS))}-word sweep")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="save results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against; exit 1 on regression")
+    parser.add_argument("--current", help="compare this saved JSON with --baseline instead of running")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current) as f:
+            results = json.load(f)
+    else:
+        results = {"environment": environment(), "settings": vars(args), "runs": []}
+        context = multiprocessing.get_context("spawn")
+        for model in args.models:
+            for backend in args.backends:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    run = executor.submit(
+                        run_config, model, backend, args.latency_claims, args.throughput_claims,
+                        args.batch_sizes, args.sweep_per_length, args.seed,
+                    ).result()
+                results["runs"].append(run)
+                print_run(run)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
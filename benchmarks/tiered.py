@@ -0,0 +1,62 @@
+"""
+Compare the tiered embedding + NLI scorer with the NLI-only path.
+
+Reports throughput of both paths, the share of claims escalated to NLI,
+and how often the tiered top-level verdict agrees with NLI-only.
+
+Usage:
+    python -m benchmarks.tiered --claims 500 --margin 0.2
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.corpus import claim_corpus
+from engine import DEFAULT_BATCH_SIZE, DEFAULT_MODEL, candidate_labels, load_scorer
+from tiered import DEFAULT_EMBEDDING_MODEL, DEFAULT_MARGIN, SentenceEncoder, TieredScorer
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--claims", type=int, default=500, help="corpus size")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="NLI model")
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--margin", type=float, default=DEFAULT_MARGIN)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    claims = claim_corpus(args.claims)
+    scorer = load_scorer(args.model)
+    tiered = TieredScorer(scorer, SentenceEncoder(args.embedding_model), margin=args.margin)
+
+    # Warm up both paths so kernel initialization is not timed
+    scorer.score_batch(claims[:8], args.batch_size)
+    tiered.score_batch(claims[:8], args.batch_size)
+
+    nli_scores, nli_time = timed(scorer.score_batch, claims, args.batch_size)
+    (tiered_scores, tiers), tiered_time = timed(tiered.score_batch_with_tiers, claims, args.batch_size)
+
+    n_main = len(candidate_labels)
+    nli_top = nli_scores[:, :n_main].argmax(1)
+    tiered_top = tiered_scores[:, :n_main].argmax(1)
+    fast = tiers == "embedding"
+
+    print(f"Claims:              {len(claims)}")
+    print(f"NLI only:            {len(claims) / nli_time:8.1f} claims/sec")
+    print(f"Tiered:              {len(claims) / tiered_time:8.1f} claims/sec")
+    print(f"Throughput gain:     {nli_time / tiered_time:8.2f}x")
+    print(f"Escalated to NLI:    {1 - fast.mean():8.1%}")
+    print(f"Agreement (all):     {np.mean(nli_top == tiered_top):8.1%}")
+    if fast.any():
+        print(f"Agreement (fast):    {np.mean(nli_top[fast] == tiered_top[fast]):8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Scaling benchmark for the multi-process worker pool.
+
+For each worker count, reports claims/sec and the memory of all worker
+processes: RSS double-counts the shared, memory-mapped weights, while
+PSS splits shared pages between processes and so shows the real total.
+Linux only (reads /proc/<pid>/smaps_rollup).
+
+Usage:
+    python -m benchmarks.workers --workers 1 2 4 8 --claims 2000
+"""
+import argparse
+import time
+
+from benchmarks.corpus import claim_corpus
+from engine import DEFAULT_BATCH_SIZE, DEFAULT_MODEL
+from workers import WorkerPool
+
+
+def memory_mb(pid):
+    """(rss, pss) of a process in MiB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1]) / 1024
+    return values["Rss:"], values["Pss:"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--claims", type=int, default=2000)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    claims = claim_corpus(args.claims)
+    baseline = None
+    print(f"{'workers':>7} {'claims/sec':>11} {'speedup':>8} {'RSS MiB':>9} {'PSS MiB':>9}")
+    for n in args.workers:
+        pool = WorkerPool(args.model, workers=n)
+        # Warm-up starts every worker and loads the mapped weights
+        pool.score_batch(claims[:n * 4], args.batch_size)
+        start = time.perf_counter()
+        pool.score_batch(claims, args.batch_size)
+        rate = len(claims) / (time.perf_counter() - start)
+        baseline = baseline or rate
+        usage = [memory_mb(pid) for pid in pool.executor._processes]
+        rss = sum(u[0] for u in usage)
+        pss = sum(u[1] for u in usage)
+        print(f"{n:>7} {rate:>11.1f} {rate / baseline:>7.2f}x {rss:>9.0f} {pss:>9.0f}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
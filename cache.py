@@ -0,0 +1,195 @@
+"""
+Content-addressed cache for claim scores.
+
+Entries are keyed on the normalized claim text, the model id and a hash
+of the label set, so editing `label_map` or switching models never
+returns stale scores. A bounded in-process LRU sits in front of a SQLite
+file that Streamlit sessions and the batch tools share.
+
+Entries of other models and label sets are kept, since other processes
+may still be using them; prune them explicitly:
+
+    python cache.py stats
+    python cache.py prune --older-than-days 30
+    python cache.py prune --stale-labels
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import CACHE_LOOKUPS
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "GREENWASH_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "greenwash", "results.sqlite"),
+)
+DEFAULT_MEMORY_ITEMS = 10000
+
+
+def normalize_claim(text):
+    """Canonical form of a claim used for cache keys"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(text, model_id, label_hash):
+    """Content address of a claim scored by a model against a label set"""
+    payload = "\0".join([model_id, label_hash, normalize_claim(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier score cache: in-memory LRU backed by an optional SQLite file"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_items=DEFAULT_MEMORY_ITEMS):
+        self.max_items = max_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, model TEXT, label_hash TEXT, scores BLOB, created REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS results_labels ON results (label_hash)")
+            self.db.commit()
+
+    def get_many(self, keys):
+        """Return {key: scores} for every key found in either tier"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+            self.hits_memory += len(found)
+            CACHE_LOOKUPS.inc("hit_memory", amount=len(found))
+            missing = [key for key in keys if key not in found]
+            if missing and self.db is not None:
+                for i in range(0, len(missing), 500):
+                    part = missing[i:i + 500]
+                    rows = self.db.execute(
+                        f"SELECT key, scores FROM results WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                    for key, blob in rows:
+                        scores = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = scores
+                        self._remember(key, scores)
+                        self.hits_disk += 1
+                        CACHE_LOOKUPS.inc("hit_disk")
+            self.misses += len(keys) - len(found)
+            CACHE_LOOKUPS.inc("miss", amount=len(keys) - len(found))
+        return found
+
+    def put_many(self, items, model_id, label_hash):
+        """Store {key: scores} computed by `model_id` against `label_hash`"""
+        with self.lock:
+            for key, scores in items.items():
+                self._remember(key, np.asarray(scores, dtype=np.float32))
+            if self.db is not None:
+                now = time.time()
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    [(key, model_id, label_hash, np.asarray(scores, dtype=np.float32).tobytes(), now)
+                     for key, scores in items.items()],
+                )
+                self.db.commit()
+
+    def _remember(self, key, scores):
+        """Insert into the LRU tier, evicting the oldest entries"""
+        self.memory[key] = scores
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def prune(self, older_than=None, label_hash=None, now=None):
+        """Delete on-disk entries older than `older_than` seconds, or scored against a label set other than `label_hash`
+
+        A maintenance call: scorers never prune on their own, so processes
+        running different label sets do not delete each other's entries.
+        """
+        if self.db is None:
+            return 0
+        conditions, params = [], []
+        if older_than is not None:
+            conditions.append("created < ?")
+            params.append((now or time.time()) - older_than)
+        if label_hash is not None:
+            conditions.append("label_hash != ?")
+            params.append(label_hash)
+        if not conditions:
+            return 0
+        with self.lock:
+            deleted = self.db.execute(f"DELETE FROM results WHERE {' OR '.join(conditions)}", params).rowcount
+            self.db.commit()
+            self.memory.clear()
+        return deleted
+
+    def entries(self):
+        """On-disk entry counts per (model, label hash)"""
+        if self.db is None:
+            return []
+        with self.lock:
+            return self.db.execute(
+                "SELECT model, label_hash, COUNT(*), MAX(created) FROM results GROUP BY model, label_hash"
+            ).fetchall()
+
+    def stats(self):
+        """Hit/miss counters and the current hit ratio"""
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_ratio": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_items": len(self.memory),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and prune the shared score cache")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite score cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="entries per model and label set")
+    prune = commands.add_parser("prune", help="delete old entries or entries of other label sets")
+    prune.add_argument("--older-than-days", type=float, help="delete entries scored longer ago than this")
+    prune.add_argument("--stale-labels", action="store_true",
+                       help="delete entries scored against any label set but the current one")
+    args = parser.parse_args()
+
+    # Imported here: engine depends on this module for cache keys
+    from engine import LABEL_HASH
+
+    cache = ResultCache(args.cache)
+    if args.command == "stats":
+        for model, label_hash, count, last in cache.entries():
+            when = time.strftime("%Y-%m-%d %H:%M", time.gmtime(last))
+            current = " (current labels)" if label_hash == LABEL_HASH else ""
+            print(f"{count:>8}  {model}  {label_hash}{current}  last {when}")
+    else:
+        if args.older_than_days is None and not args.stale_labels:
+            parser.error("prune needs --older-than-days and/or --stale-labels")
+        older_than = None if args.older_than_days is None else args.older_than_days * 86400
+        deleted = cache.prune(older_than, LABEL_HASH if args.stale_labels else None)
+        print(f"Deleted {deleted} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Near-duplicate claim deduplication with MinHash and LSH.
+
+Each claim is reduced to character shingles and a MinHash signature.
+An LSH index over signature bands finds earlier claims that are likely
+similar; a claim joins the cluster of the most similar representative whose
+estimated Jaccard similarity reaches the threshold and that states the
+same numbers ("50% recycled" never joins "100% recycled"), or starts a
+new cluster. Only cluster representatives are scored; members copy their
+representative's scores.
+
+The index keeps each cluster's signature, LSH bucket entries and scores,
+about 3 KB per cluster with the defaults. Before each batch is assigned,
+clusters beyond `max_clusters` are dropped least recently matched first,
+so a later near-duplicate of a dropped cluster starts a new one and is
+scored again.
+"""
+import re
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from cache import normalize_claim
+from engine import DEFAULT_BATCH_SIZE
+
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5
+# About 300 MB of signatures, buckets and scores
+DEFAULT_MAX_CLUSTERS = 100000
+NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def lsh_bands(threshold, num_perm):
+    """(bands, rows) with bands * rows <= num_perm whose LSH threshold is closest to `threshold`
+
+    Two signatures become candidates when all rows of any band match,
+    which happens with 50% probability near (1 / bands) ** (1 / rows).
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1)]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+def shingles(text, size=DEFAULT_SHINGLE_SIZE):
+    """Hashed character shingles of a claim, ignoring case and punctuation"""
+    text = re.sub(r"[^\w\s]", "", normalize_claim(text).lower())
+    text = " ".join(text.split())
+    if len(text) <= size:
+        return np.array([zlib.crc32(text.encode("utf-8"))], dtype=np.uint64)
+    grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class NearDuplicateIndex:
+    """Greedy MinHash/LSH clustering that keeps one representative per cluster"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, shingle_size=DEFAULT_SHINGLE_SIZE,
+                 seed=1, max_clusters=DEFAULT_MAX_CLUSTERS):
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: ((a * x + b) mod 2**64) >> 32, with odd a
+        self.a = rng.integers(1, 2 ** 63, size=self.bands * self.rows, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=self.bands * self.rows, dtype=np.uint64)
+        self.buckets = [{} for _ in range(self.bands)]
+        # cluster id -> (signature, numbers stated), least recently matched first
+        self.clusters = OrderedDict()
+        # Clusters ever created; also the id of the next one
+        self.created = 0
+        # Scores of each cluster's representative, filled in by score_deduplicated
+        self.scores = {}
+        # Other per-cluster values callers keep alongside the scores, dropped with the cluster
+        self.annotations = {}
+
+    def signature(self, text):
+        hashes = shingles(text, self.shingle_size)
+        with np.errstate(over="ignore"):
+            permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def assign(self, texts):
+        """Return the cluster id of each text, creating clusters for new representatives"""
+        cluster_ids = []
+        for text in texts:
+            signature = self.signature(text)
+            numbers = sorted(NUMBER.findall(text))
+            keys = self.band_keys(signature)
+            candidates = {cluster for bucket, key in zip(self.buckets, keys) for cluster in bucket.get(key, ())}
+            best, best_similarity = None, self.threshold
+            for cluster in sorted(candidates):
+                cluster_signature, cluster_numbers = self.clusters[cluster]
+                if cluster_numbers != numbers:
+                    continue
+                similarity = float(np.mean(cluster_signature == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = cluster, similarity
+            if best is None:
+                best = self.created
+                self.created += 1
+                self.clusters[best] = (signature, numbers)
+                for bucket, key in zip(self.buckets, keys):
+                    bucket.setdefault(key, []).append(best)
+            else:
+                self.clusters.move_to_end(best)
+            cluster_ids.append(best)
+        return cluster_ids
+
+    def band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def trim(self):
+        """Drop the least recently matched clusters beyond max_clusters"""
+        while self.max_clusters and len(self.clusters) > self.max_clusters:
+            cluster, (signature, _) = self.clusters.popitem(last=False)
+            for bucket, key in zip(self.buckets, self.band_keys(signature)):
+                members = bucket[key]
+                members.remove(cluster)
+                if not members:
+                    del bucket[key]
+            self.scores.pop(cluster, None)
+            self.annotations.pop(cluster, None)
+
+    def stats(self):
+        return {"clusters": self.created, "kept": len(self.clusters), "bands": self.bands, "rows": self.rows}
+
+
+def score_deduplicated(index, scorer, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+    """Score texts through their cluster representatives
+
+    Returns the score matrix for all texts, in order, the cluster id of
+    each, and how many texts went to the model.
+    """
+    texts = list(texts)
+    # Trimmed before assigning, so every cluster this call returns still has its scores
+    index.trim()
+    cluster_ids = index.assign(texts)
+    representatives = {}
+    for text, cluster in zip(texts, cluster_ids):
+        if cluster not in index.scores:
+            representatives.setdefault(cluster, text)
+    if representatives:
+        scores = scorer.score_batch(list(representatives.values()), batch_size, detail_mode)
+        for cluster, row in zip(representatives, scores):
+            index.scores[cluster] = row
+    return np.stack([index.scores[cluster] for cluster in cluster_ids]), cluster_ids, len(representatives)
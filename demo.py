@@ -13,11 +13,12 @@ def demo_greenwashing_detection():
     # Load the model
     print("Loading AI model... (This may take a moment)")
     try:
+        start = time.perf_counter()
         classifier = pipeline(
             "zero-shot-classification",
             model="facebook/bart-large-mnli"
         )
-        print("✅ Model loaded successfully!")
+        print(f"✅ Model loaded successfully! ({time.perf_counter() - start:.1f}s)")
     except Exception as e:
         print(f"❌ Error loading model: {e}")
         return
@@ -54,7 +55,9 @@ def demo_greenwashing_detection():
         
         try:
             # Perform classification
+            start = time.perf_counter()
             result = classifier(test_case['claim'], candidate_labels)
+            latency = time.perf_counter() - start
             
             # Display results
             prediction = result['labels'][0]
@@ -62,6 +65,7 @@ def demo_greenwashing_detection():
             
             print(f"   🤖 AI Prediction: {prediction}")
             print(f"   📊 Confidence: {confidence:.2%}")
+            print(f"   ⏱️ Latency: {latency * 1000:.0f} ms")
             
             # Show confidence for both labels
             print("   📈 All Scores:")
@@ -0,0 +1,204 @@
+"""
+Document mode: score long sustainability reports sentence by sentence.
+
+Reports (plain text, or PDF text extracted locally) are split into
+sections and sentences, obvious boilerplate is dropped with a cheap
+lexical pre-filter, and the remaining claims are scored in batches.
+Per-section aggregates are yielded as soon as every claim in a section
+has been scored, so only the claims of the current window are held in
+memory.
+"""
+import heapq
+import re
+
+import numpy as np
+
+from engine import DEFAULT_BATCH_SIZE, DEFAULT_WINDOW, candidate_labels, chunked
+
+# Flagged sentences kept per section, ranked by greenwashing score
+TOP_CLAIMS = 5
+# Plain-text sections longer than this are split into continuation sections
+MAX_SECTION_CHARS = 20000
+# Claims per batch when summaries stream to a UI: small enough that the
+# first sections are reported long before a large report is done
+STREAM_WINDOW = 64
+
+SUSTAINABILITY_TERMS = re.compile(
+    r"\b(sustainab\w*|environment\w*|eco[- ]?\w*|green\w*|carbon|co2|emission\w*|climate|net[- ]zero|"
+    r"renewable\w*|recycl\w*|biodegrad\w*|compost\w*|organic|plastic\w*|packaging|waste|water|energy|"
+    r"biodiversity|deforestation|forest\w*|ghg|greenhouse|footprint|offset\w*|neutral|circular|"
+    r"ethical\w*|responsib\w*|planet|natural|clean|pollut\w*|certif\w*|scope [123])\b",
+    re.IGNORECASE,
+)
+BOILERPLATE = re.compile(
+    r"(https?://|www\.|©|copyright|all rights reserved|table of contents|\.{4,}|^page \d+|^\d+$)",
+    re.IGNORECASE,
+)
+# Sentence boundary: terminal punctuation followed by whitespace and a capital/digit/quote
+SENTENCE_BREAK = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[A-Z0-9\"'(\[])")
+ABBREVIATIONS = re.compile(r"\b(e\.g|i\.e|etc|vs|inc|ltd|co|no|fig|approx|incl|dr|mr|ms|mrs|st)\.$", re.IGNORECASE)
+GREENWASHING = candidate_labels.index("Greenwashing")
+HEADING = re.compile(r"^(\d+(\.\d+)*\.?\s+)?[A-Z][^.!?]{2,80}$")
+
+
+def clean_text(text):
+    """Undo PDF line-break hyphenation and collapse whitespace within lines"""
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    return "\n".join(re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines())
+
+
+def split_sentences(text):
+    """Split text into sentences with a regex splitter that respects common abbreviations"""
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        pending = ""
+        for part in SENTENCE_BREAK.split(paragraph):
+            pending = f"{pending} {part}".strip() if pending else part
+            if not ABBREVIATIONS.search(pending):
+                sentences.append(pending)
+                pending = ""
+        if pending:
+            sentences.append(pending)
+    return sentences
+
+
+def is_claim(sentence, min_words=5, max_words=80):
+    """Cheap pre-filter: keep sentences that look like sustainability claims"""
+    words = sentence.split()
+    if not min_words <= len(words) <= max_words:
+        return False
+    if BOILERPLATE.search(sentence):
+        return False
+    letters = sum(c.isalpha() for c in sentence)
+    if letters < 0.5 * len(sentence):
+        return False
+    return bool(SUSTAINABILITY_TERMS.search(sentence))
+
+
+def text_sections(text):
+    """Yield (title, body) sections of a plain-text report
+
+    A short capitalized line without terminal punctuation that follows a
+    blank line starts a new section.
+    """
+    title, lines, size, part = "Introduction", [], 0, 1
+    previous_blank = True
+    for line in clean_text(text).splitlines():
+        if previous_blank and HEADING.match(line) and len(line.split()) <= 12:
+            if lines:
+                yield title, "\n".join(lines)
+            title, lines, size, part = line, [], 0, 1
+        else:
+            lines.append(line)
+            size += len(line)
+            if size > MAX_SECTION_CHARS and not line:
+                yield title if part == 1 else f"{title} (cont. {part})", "\n".join(lines)
+                lines, size, part = [], 0, part + 1
+        previous_blank = not line
+    if lines:
+        yield title if part == 1 else f"{title} (cont. {part})", "\n".join(lines)
+
+
+def pdf_sections(file):
+    """Yield ("Page N", text) for every page of a PDF, extracted locally"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file)
+    for number, page in enumerate(reader.pages, 1):
+        yield f"Page {number}", clean_text(page.extract_text() or "")
+
+
+class SectionAggregate:
+    """Running totals for one section; holds only its top flagged claims"""
+
+    def __init__(self, index, title):
+        self.index = index
+        self.title = title
+        self.sentences = 0
+        self.claims = 0
+        self.pending = 0
+        self.closed = False
+        self.verdicts = dict.fromkeys(candidate_labels, 0)
+        self.score_sums = np.zeros(len(candidate_labels))
+        self.flagged = []
+
+    def add(self, sentence, main_scores, top_claims=TOP_CLAIMS):
+        self.claims += 1
+        self.pending -= 1
+        self.verdicts[candidate_labels[int(main_scores.argmax())]] += 1
+        self.score_sums += main_scores
+        item = (float(main_scores[GREENWASHING]), sentence)
+        if len(self.flagged) < top_claims:
+            heapq.heappush(self.flagged, item)
+        else:
+            heapq.heappushpop(self.flagged, item)
+
+    def to_dict(self):
+        means = self.score_sums / self.claims if self.claims else self.score_sums
+        return {
+            "section": self.title,
+            "index": self.index,
+            "sentences": self.sentences,
+            "claims": self.claims,
+            "verdicts": dict(self.verdicts),
+            "mean_scores": dict(zip(candidate_labels, means.round(4).tolist())),
+            "top_greenwashing_claims": [
+                {"claim": sentence, "score": round(score, 4)}
+                for score, sentence in sorted(self.flagged, reverse=True)
+            ],
+        }
+
+
+def analyze_document(sections, scorer, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW):
+    """Score a report and yield a summary dict per section as it completes
+
+    `sections` is an iterable of (title, text) pairs such as
+    text_sections() or pdf_sections(). Claims from consecutive sections
+    share batches of up to `window` claims; a section is reported once
+    all of its claims are in, so interactive callers should pass a small
+    window such as STREAM_WINDOW.
+    """
+    open_sections = {}
+
+    def claims():
+        for index, (title, text) in enumerate(sections):
+            aggregate = open_sections[index] = SectionAggregate(index, title)
+            for sentence in split_sentences(text):
+                aggregate.sentences += 1
+                if is_claim(sentence):
+                    aggregate.pending += 1
+                    yield index, sentence
+            aggregate.closed = True
+
+    def finished():
+        for index in sorted(open_sections):
+            aggregate = open_sections[index]
+            if not (aggregate.closed and aggregate.pending == 0):
+                break
+            del open_sections[index]
+            yield aggregate.to_dict()
+
+    n_main = len(candidate_labels)
+    for chunk in chunked(claims(), window):
+        # Sections are summarized by top-level verdict only, so skip the indicators
+        scores = scorer.score_batch([sentence for _, sentence in chunk], batch_size, detail_mode="none")
+        for (index, sentence), row in zip(chunk, scores):
+            open_sections[index].add(sentence, row[:n_main])
+        yield from finished()
+    # Sections after the last claim
+    yield from finished()
+
+
+def summarize(section_summaries):
+    """Combine per-section summaries into document-level totals"""
+    totals = {"sections": 0, "sentences": 0, "claims": 0, "verdicts": dict.fromkeys(candidate_labels, 0)}
+    for summary in section_summaries:
+        totals["sections"] += 1
+        totals["sentences"] += summary["sentences"]
+        totals["claims"] += summary["claims"]
+        for label, count in summary["verdicts"].items():
+            totals["verdicts"][label] += count
+    return totals
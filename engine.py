@@ -0,0 +1,421 @@
+"""
+Scoring engine for sustainability claims.
+
+Every hypothesis a claim needs (top-level categories and detailed
+indicators) is built into one padded batch, so a single forward pass
+produces both the main and the detailed classification.
+
+This module has no Streamlit dependency, and torch/transformers are
+imported only when a model is loaded or run, so workers that just need
+the label taxonomy or helpers start quickly.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+
+from cache import cache_key
+from metrics import CLAIMS_SCORED, FORWARD_BATCH_PAIRS, timed
+
+DEFAULT_MODEL = "typeform/distilbert-base-uncased-mnli"
+# Inference backend: "torch", "onnx" or "onnx-int8"
+DEFAULT_BACKEND = os.environ.get("GREENWASH_BACKEND", "torch")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+# Weight precision of torch models; the ONNX backends choose theirs by name
+PRECISIONS = {"fp32": "float32", "fp16": "float16", "bf16": "bfloat16"}
+DEFAULT_PRECISION = "fp32"
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+# (claim, label) pairs sent to the model per forward pass in batch mode
+DEFAULT_BATCH_SIZE = 256
+# Claims sorted together by length before batching; bounds memory per window
+DEFAULT_WINDOW = 4096
+
+# Which detailed indicators to score: every one, only those of the leading
+# categories, or none (top-level verdict only)
+DETAIL_MODES = ("all", "hierarchical", "none")
+# In hierarchical mode a category's indicators are scored when its score
+# reaches DEFAULT_MIN_CONFIDENCE or lies within DEFAULT_DETAIL_MARGIN of the winner
+DEFAULT_MIN_CONFIDENCE = 0.5
+DEFAULT_DETAIL_MARGIN = 0.1
+# Partly scored rows (from "none" or "hierarchical" calls) kept so a later
+# call for the same claim only runs the pairs that are still missing
+PARTIAL_ROWS = 4096
+# Per-claim annotations (agreement, tier, rule) kept for callers that only see scores
+RECENT_VALUES = 65536
+
+# Top-level categories shown as the main verdict
+candidate_labels = [
+    "Greenwashing",
+    "Genuine Sustainability",
+    "Marketing Hype"
+]
+
+# Label mapping for main categories and their detailed indicators
+label_map = {
+    "Greenwashing": [
+        "Misleading environmental claim",
+        "Vague sustainability statement",
+        "Unsubstantiated green marketing",
+        "Overstated eco-friendly benefits",
+        "Use of irrelevant green imagery"
+    ],
+    "Genuine Sustainability": [
+        "Authentic environmental commitment",
+        "Verified sustainable practice",
+        "Third-party sustainability certification",
+        "Transparency in environmental impact",
+        "Evidence-based climate action"
+    ],
+    "Marketing Hype": [
+        "Generic green buzzwords",
+        "Emotional appeal without proof",
+        "Sustainability used as a selling point",
+        "Trendy environmental phrasing"
+    ]
+}
+
+# Flat list of every detailed indicator, in label_map order
+detailed_labels = [label for labels in label_map.values() for label in labels]
+
+
+def nli_label_ids(config):
+    """Return the (contradiction, entailment) logit indices of an NLI model"""
+    entailment_id = -1
+    for label, ind in config.label2id.items():
+        if label.lower().startswith("entail"):
+            entailment_id = ind
+            break
+    contradiction_id = -1 if entailment_id == 0 else 0
+    return contradiction_id, entailment_id
+
+
+def hypotheses_hash(hypotheses):
+    """Short hash of the hypotheses; changes with the template or taxonomy, invalidating cached scores"""
+    return hashlib.sha256("\n".join(hypotheses).encode("utf-8")).hexdigest()[:16]
+
+
+# Label hash of the running taxonomy, as computed by every scorer
+LABEL_HASH = hypotheses_hash([HYPOTHESIS_TEMPLATE.format(label) for label in candidate_labels + detailed_labels])
+
+
+def chunked(iterable, size):
+    """Yield successive lists of up to `size` items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class RecentValues:
+    """Bounded, thread-safe map from recently scored claims to a value about how they were scored
+
+    Wrappers such as EnsembleScorer record what only they know (agreement,
+    tier, deciding rule) here, so callers that receive plain score rows
+    through other wrappers can still look it up by claim.
+    """
+
+    def __init__(self, size=RECENT_VALUES):
+        self.size = size
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+
+    def update(self, texts, values):
+        with self.lock:
+            for text, value in zip(texts, values):
+                self.values[text] = value
+                self.values.move_to_end(text)
+            while len(self.values) > self.size:
+                self.values.popitem(last=False)
+
+    def get_many(self, texts, default=None):
+        with self.lock:
+            return [self.values.get(text, default) for text in texts]
+
+
+def build_result(text, labels, scores):
+    """Format scores like the zero-shot pipeline: labels sorted by score
+
+    Labels whose score is NaN were not evaluated and are left out.
+    """
+    valid = np.flatnonzero(~np.isnan(scores))
+    top_inds = list(reversed(valid[scores[valid].argsort()]))
+    return {
+        "sequence": text,
+        "labels": [labels[i] for i in top_inds],
+        "scores": scores[top_inds].tolist(),
+    }
+
+
+def split_results(text, scores):
+    """Turn one row of scores over candidate_labels + detailed_labels into (result, detailed_result)"""
+    n_main = len(candidate_labels)
+    with timed("postprocess"):
+        result = build_result(text, candidate_labels, scores[:n_main])
+        detailed_result = build_result(text, detailed_labels, scores[n_main:])
+    return result, detailed_result
+
+
+class ClaimScorer:
+    """Zero-shot NLI scorer that evaluates all labels of a claim in one pass"""
+
+    def __init__(self, model, tokenizer, cache=None, model_id=None, detail_mode="all",
+                 min_confidence=DEFAULT_MIN_CONFIDENCE, detail_margin=DEFAULT_DETAIL_MARGIN):
+        if detail_mode not in DETAIL_MODES:
+            raise ValueError(f"Unknown detail mode {detail_mode!r}; expected one of {DETAIL_MODES}")
+        self.model = model
+        self.tokenizer = tokenizer
+        self.model_id = model_id or model.config.name_or_path
+        self.contradiction_id, self.entailment_id = nli_label_ids(model.config)
+        self.labels = candidate_labels + detailed_labels
+        self.hypotheses = [HYPOTHESIS_TEMPLATE.format(label) for label in self.labels]
+        # Score columns of each category's indicators, in candidate_labels order
+        n_main = len(candidate_labels)
+        self.indicator_columns = [
+            [n_main + detailed_labels.index(label) for label in label_map[category]]
+            for category in candidate_labels
+        ]
+        self.detail_mode = detail_mode
+        self.min_confidence = min_confidence
+        self.detail_margin = detail_margin
+        self.label_hash = hypotheses_hash(self.hypotheses)
+        self.compile_hypotheses()
+        self.cache = cache
+        # cache key -> (scores with NaN for unscored pairs, claim token ids)
+        self.partial = OrderedDict()
+        self.partial_lock = threading.Lock()
+
+    @classmethod
+    def from_pipeline(cls, classifier, cache=None, **options):
+        """Reuse the model and tokenizer of a zero-shot-classification pipeline"""
+        return cls(classifier.model, classifier.tokenizer, cache=cache, **options)
+
+    def entailment_scores(self, logits):
+        """Softmax entailment vs. contradiction independently for every pair"""
+        pair_logits = logits[..., [self.contradiction_id, self.entailment_id]]
+        pair_logits = pair_logits - pair_logits.max(-1, keepdims=True)
+        probs = np.exp(pair_logits)
+        return probs[..., 1] / probs.sum(-1)
+
+    def compile_hypotheses(self):
+        """Tokenize every hypothesis once so only the claim varies per request
+
+        Each (claim, hypothesis) input is laid out as prefix + claim +
+        suffix[label]. The special tokens around the claim are found by
+        encoding a marker premise, which works for BERT- and BART-style
+        pair formats alike.
+        """
+        tokenizer = self.tokenizer
+        self.pad_token_id = tokenizer.pad_token_id
+        if self.pad_token_id is None:
+            self.pad_token_id = tokenizer.eos_token_id
+        max_positions = getattr(self.model.config, "max_position_embeddings", None) or tokenizer.model_max_length
+        self.max_length = min(tokenizer.model_max_length, max_positions)
+        self.use_token_types = "token_type_ids" in tokenizer.model_input_names
+
+        marker = tokenizer("claim", add_special_tokens=False)["input_ids"]
+        self.prefixes, self.suffixes = [], []
+        for hypothesis in self.hypotheses:
+            encoded = tokenizer("claim", hypothesis, return_token_type_ids=self.use_token_types)
+            ids = encoded["input_ids"]
+            start = next(i for i in range(len(ids)) if ids[i:i + len(marker)] == marker)
+            end = start + len(marker)
+            types = encoded["token_type_ids"] if self.use_token_types else [0] * len(ids)
+            self.prefixes.append((np.array(ids[:start]), np.array(types[:start]), types[start]))
+            self.suffixes.append((np.array(ids[end:]), np.array(types[end:])))
+
+    def encode_claims(self, texts):
+        """Tokenize claims without special tokens; the only per-request tokenization"""
+        with timed("tokenize"):
+            return self.tokenizer(list(texts), add_special_tokens=False, verbose=False)["input_ids"]
+
+    def build_inputs(self, claim_ids, label_indices):
+        """Join claim token ids onto the precompiled hypothesis encodings"""
+        import torch
+
+        rows = []
+        for ids, j in zip(claim_ids, label_indices):
+            prefix, prefix_types, claim_type = self.prefixes[j]
+            suffix, suffix_types = self.suffixes[j]
+            # Truncate only the claim, like truncation="only_first"
+            ids = ids[:max(0, self.max_length - len(prefix) - len(suffix))]
+            rows.append((prefix, prefix_types, ids, claim_type, suffix, suffix_types))
+        width = max(len(r[0]) + len(r[2]) + len(r[4]) for r in rows)
+        input_ids = np.full((len(rows), width), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(rows), width), dtype=np.int64)
+        token_type_ids = np.zeros((len(rows), width), dtype=np.int64)
+        for n, (prefix, prefix_types, ids, claim_type, suffix, suffix_types) in enumerate(rows):
+            a = len(prefix)
+            b = a + len(ids)
+            c = b + len(suffix)
+            input_ids[n, :a] = prefix
+            input_ids[n, a:b] = ids
+            input_ids[n, b:c] = suffix
+            attention_mask[n, :c] = 1
+            token_type_ids[n, :a] = prefix_types
+            token_type_ids[n, a:b] = claim_type
+            token_type_ids[n, b:c] = suffix_types
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if self.use_token_types:
+            inputs["token_type_ids"] = token_type_ids
+        return {name: torch.from_numpy(array).to(self.model.device) for name, array in inputs.items()}
+
+    def forward(self, inputs):
+        """Run one padded forward pass and return per-pair entailment scores"""
+        import torch
+
+        with torch.inference_mode():
+            logits = self.model(**inputs).logits
+        return self.entailment_scores(logits.float().cpu().numpy())
+
+    def score(self, text):
+        """Return the entailment score of every label in self.labels"""
+        return self.score_batch([text], batch_size=len(self.hypotheses))[0]
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        """Return an (n_claims, n_labels) score matrix, reusing cached rows
+
+        detail_mode overrides the scorer's default for this call. Only
+        complete rows are cached; indicators that were not scored are NaN.
+        Claims partly scored by a recent call only have their missing
+        pairs run, e.g. the indicators after a verdict-only call.
+        """
+        detail_mode = detail_mode or self.detail_mode
+        keys = [cache_key(text, self.model_id, self.label_hash) for text in texts]
+        cached = self.cache.get_many(keys) if self.cache is not None else {}
+        # Score each distinct uncached claim once, even if repeated in the batch
+        pending = {}
+        for text, key in zip(texts, keys):
+            if key not in cached and key not in pending:
+                pending[key] = text
+        if pending:
+            with self.partial_lock:
+                known = [self.partial.get(key) for key in pending]
+            computed, token_ids = self.complete_batch(list(pending.values()), batch_size, detail_mode, known)
+            fresh = dict(zip(pending, computed))
+            with self.partial_lock:
+                for key, row, ids in zip(pending, computed, token_ids):
+                    if detail_mode == "all":
+                        self.partial.pop(key, None)
+                    else:
+                        self.partial[key] = (row, ids)
+                        self.partial.move_to_end(key)
+                while len(self.partial) > PARTIAL_ROWS:
+                    self.partial.popitem(last=False)
+            if detail_mode == "all" and self.cache is not None:
+                self.cache.put_many(fresh, self.model_id, self.label_hash)
+            cached.update(fresh)
+        return np.stack([cached[key] for key in keys])
+
+    def run_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode="all"):
+        """Score claims with the model, ignoring the cache"""
+        return self.complete_batch(texts, batch_size, detail_mode, [None] * len(texts))[0]
+
+    def complete_batch(self, texts, batch_size, detail_mode, known):
+        """Run the pairs each claim still needs; return (scores, claim token ids)
+
+        `known` holds a (scores, token ids) pair from an earlier partial
+        call, or None, per claim. Only pairs that are NaN in the known
+        scores are run.
+        """
+        scores = np.full((len(texts), len(self.hypotheses)), np.nan, dtype=np.float32)
+        new = [i for i, entry in enumerate(known) if entry is None]
+        encoded = iter(self.encode_claims([texts[i] for i in new]) if new else [])
+        token_ids = [next(encoded) if entry is None else entry[1] for entry in known]
+        for i, entry in enumerate(known):
+            if entry is not None:
+                scores[i] = entry[0]
+        # Claims completed from a partial row were counted when first scored
+        CLAIMS_SCORED.inc(amount=len(new))
+        missing = np.isnan(scores)
+        # Sort by token length so each batch pads to similar lengths
+        order = np.argsort([len(ids) for ids in token_ids], kind="stable")
+        n_main = len(candidate_labels)
+        if detail_mode == "all":
+            columns = range(len(self.hypotheses))
+            self.score_pairs(token_ids, ((i, j) for i in order for j in columns if missing[i, j]), scores, batch_size)
+        else:
+            # Hierarchical: top-level categories first, then only the indicators
+            # of categories that are confident or close to the winner
+            self.score_pairs(token_ids, ((i, j) for i in order for j in range(n_main) if missing[i, j]), scores,
+                             batch_size)
+            if detail_mode == "hierarchical":
+                main = scores[:, :n_main]
+                expand = (main >= self.min_confidence) | (main >= main.max(1, keepdims=True) - self.detail_margin)
+                pairs = (
+                    (i, j)
+                    for i in order
+                    for category in np.flatnonzero(expand[i])
+                    for j in self.indicator_columns[category]
+                    if missing[i, j]
+                )
+                self.score_pairs(token_ids, pairs, scores, batch_size)
+        return scores, token_ids
+
+    def score_pairs(self, token_ids, pairs, scores, batch_size):
+        """Fill scores[i, j] for every (claim, label) pair, batch_size pairs per pass"""
+        for chunk in chunked(pairs, batch_size):
+            rows, cols = zip(*chunk)
+            with timed("assemble"):
+                inputs = self.build_inputs([token_ids[i] for i in rows], cols)
+            FORWARD_BATCH_PAIRS.observe(len(rows))
+            with timed("forward"):
+                scores[rows, cols] = self.forward(inputs)
+
+    def split_results(self, text, scores):
+        """Turn one row of label scores into (result, detailed_result)"""
+        return split_results(text, scores)
+
+    def analyze(self, text):
+        """Return (result, detailed_result) dicts from a single forward pass"""
+        return self.split_results(text, self.score(text))
+
+    def analyze_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW, detail_mode=None):
+        """Yield (result, detailed_result) for every claim, in input order
+
+        Claims are read `window` at a time, so arbitrarily long iterables
+        are scored with bounded memory.
+        """
+        for window_texts in chunked(texts, window):
+            scores = self.score_batch(window_texts, batch_size, detail_mode)
+            for text, row in zip(window_texts, scores):
+                yield self.split_results(text, row)
+
+
+def load_scorer(model=DEFAULT_MODEL, cache=None, backend=DEFAULT_BACKEND, precision=DEFAULT_PRECISION, **options):
+    """Load an NLI model with the chosen backend and wrap it in a ClaimScorer
+
+    Extra keyword options (detail_mode, min_confidence, detail_margin)
+    are passed to ClaimScorer.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {tuple(PRECISIONS)}")
+    if backend != "torch" and precision != DEFAULT_PRECISION:
+        raise ValueError(f"Precision {precision!r} needs the torch backend; use onnx-int8 for a smaller ONNX model")
+    with timed("load"):
+        if backend != "torch":
+            # ONNX Runtime is optional; only import it when asked for
+            from backends import load_onnx_model
+
+            onnx_model, tokenizer = load_onnx_model(model, quantize=backend == "onnx-int8")
+            return ClaimScorer(onnx_model, tokenizer, cache=cache, model_id=f"{model}@{backend}", **options)
+        import torch
+        from transformers import pipeline
+
+        classifier = pipeline(
+            "zero-shot-classification",
+            model=model,
+            device=0 if torch.cuda.is_available() else -1,
+            dtype=getattr(torch, PRECISIONS[precision]),
+        )
+        if precision != DEFAULT_PRECISION:
+            # Reduced-precision scores differ slightly, so they get their own cache entries
+            options.setdefault("model_id", f"{model}@{precision}")
+        return ClaimScorer.from_pipeline(classifier, cache=cache, **options)
@@ -0,0 +1,183 @@
+"""
+Ensemble scoring across several NLI models.
+
+Every member scores the same batch of claims on its own thread; torch and
+ONNX Runtime release the GIL during forward passes, so with enough cores
+(or a GPU) the members run side by side and a batch takes about as long
+as the slowest member rather than the sum. Member score matrices are
+stacked into one (models, claims, labels) array and fused in NumPy,
+either by weighted averaging or by voting, where each model votes for
+its top-level verdict with its confidence. Temperatures fitted against
+reference verdicts (calibrate, or `--calibration-csv` in batch_score.py)
+put the members' confidences on one scale before fusing. Agreement is
+the weighted share of models whose verdict matches the fused one.
+"""
+import contextvars
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from engine import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_WINDOW,
+    RecentValues,
+    candidate_labels,
+    chunked,
+    detailed_labels,
+    split_results,
+)
+from metrics import timed
+
+FUSION_METHODS = ("average", "vote")
+# Temperatures tried by fit_temperatures, on the logit scale
+TEMPERATURE_GRID = np.geomspace(0.25, 4, 33)
+
+
+def read_reference(path, column="claim", label_column="label"):
+    """(claims, top-level labels) from a CSV of reference verdicts"""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = [(row[column], row[label_column]) for row in csv.DictReader(f)]
+    unknown = sorted({label for _, label in rows} - set(candidate_labels))
+    if unknown:
+        raise ValueError(f"Unknown labels {unknown} in {path}; expected some of {candidate_labels}")
+    return [claim for claim, _ in rows], [label for _, label in rows]
+
+
+def apply_temperatures(scores, temperatures):
+    """Rescale (n_models, n_claims, n_labels) entailment probabilities by one temperature per model"""
+    clipped = np.clip(scores, 1e-6, 1 - 1e-6)
+    logits = np.log(clipped / (1 - clipped)) / np.asarray(temperatures, dtype=np.float32)[:, None, None]
+    return 1 / (1 + np.exp(-logits))
+
+
+def fit_temperatures(scores, reference, grid=TEMPERATURE_GRID):
+    """Per-model temperature minimizing top-level log loss against reference verdicts
+
+    `scores` are member scores from EnsembleScorer.member_scores and
+    `reference` holds one top-level label per claim.
+    """
+    n_main = len(candidate_labels)
+    target = np.asarray(reference, dtype=object)[:, None] == np.array(candidate_labels, dtype=object)
+    main = np.clip(scores[:, :, :n_main], 1e-6, 1 - 1e-6)
+    logits = np.log(main / (1 - main))
+    # (grid, models, claims, labels) probabilities for every candidate temperature at once
+    probs = np.clip(1 / (1 + np.exp(-logits[None] / grid[:, None, None, None])), 1e-6, 1 - 1e-6)
+    loss = -np.where(target, np.log(probs), np.log(1 - probs)).mean(axis=(2, 3))
+    return grid[loss.argmin(0)].astype(np.float32)
+
+
+def fuse(scores, weights, method="average", temperatures=None):
+    """Fuse member scores into (scores, agreement, member verdicts)
+
+    `scores` is (n_models, n_claims, n_labels). Labels a member did not
+    score (NaN) are averaged over the members that did. With "vote", the
+    top-level columns hold each category's share of confidence-weighted
+    votes instead of the averaged scores.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method {method!r}; expected one of {FUSION_METHODS}")
+    if temperatures is not None:
+        scores = apply_temperatures(scores, temperatures)
+    weights = np.asarray(weights, dtype=np.float32)[:, None, None]
+    n_main = len(candidate_labels)
+    present = ~np.isnan(scores)
+    mass = np.where(present, weights, 0).sum(0)
+    with np.errstate(invalid="ignore"):
+        fused = np.where(present, scores * weights, 0).sum(0) / mass
+    main = scores[:, :, :n_main]
+    verdicts = main.argmax(2)
+    if method == "vote":
+        confidence = np.take_along_axis(main, verdicts[..., None], 2)
+        ballots = (verdicts[..., None] == np.arange(n_main)) * confidence * weights
+        fused[:, :n_main] = ballots.sum(0) / weights.sum()
+    agreement = ((verdicts == fused[:, :n_main].argmax(1)) * weights[:, :, 0]).sum(0) / weights.sum()
+    return fused.astype(np.float32), agreement, verdicts
+
+
+class EnsembleScorer:
+    """Several scorers fused into one; a drop-in for ClaimScorer.score_batch"""
+
+    def __init__(self, scorers, weights=None, method="average", temperatures=None, concurrent=True):
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method {method!r}; expected one of {FUSION_METHODS}")
+        self.scorers = list(scorers)
+        self.weights = np.ones(len(self.scorers), dtype=np.float32) if weights is None else np.asarray(weights)
+        if len(self.weights) != len(self.scorers):
+            raise ValueError(f"Expected {len(self.scorers)} weights, got {len(self.weights)}")
+        self.method = method
+        if temperatures is not None and len(temperatures) != len(self.scorers):
+            raise ValueError(f"Expected {len(self.scorers)} temperatures, got {len(temperatures)}")
+        self.temperatures = temperatures
+        self.agreements = RecentValues()
+        self.labels = candidate_labels + detailed_labels
+        self.executor = None
+        if concurrent and len(self.scorers) > 1:
+            self.executor = ThreadPoolExecutor(max_workers=len(self.scorers), thread_name_prefix="ensemble")
+
+    @property
+    def model_id(self):
+        return f"ensemble({'+'.join(scorer.model_id for scorer in self.scorers)};{self.method})"
+
+    @property
+    def label_hash(self):
+        return self.scorers[0].label_hash
+
+    def member_scores(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        """(n_models, n_claims, n_labels) scores, every member scoring the same batch"""
+        texts = list(texts)
+        if self.executor is None:
+            return np.stack([scorer.score_batch(texts, batch_size, detail_mode) for scorer in self.scorers])
+        # Members run in a copy of the caller's context, so their stage timings join its trace
+        futures = [
+            self.executor.submit(contextvars.copy_context().run, scorer.score_batch, texts, batch_size, detail_mode)
+            for scorer in self.scorers
+        ]
+        return np.stack([future.result() for future in futures])
+
+    def score_batch_with_agreement(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        """Return (fused scores, agreement per claim, member verdicts) for a list of claims"""
+        texts = list(texts)
+        scores = self.member_scores(texts, batch_size, detail_mode)
+        with timed("fuse"):
+            fused, agreement, verdicts = fuse(scores, self.weights, self.method, self.temperatures)
+        self.agreements.update(texts, agreement.tolist())
+        return fused, agreement, verdicts
+
+    def agreement_of(self, texts):
+        """Agreement of claims this ensemble scored recently, NaN for the others
+
+        For callers that only see fused scores, such as a RuleScorer or a
+        claim history wrapped around the ensemble.
+        """
+        return np.array(self.agreements.get_many(texts, np.nan), dtype=np.float32)
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        return self.score_batch_with_agreement(texts, batch_size, detail_mode)[0]
+
+    def calibrate(self, texts, reference, batch_size=DEFAULT_BATCH_SIZE):
+        """Fit and keep one temperature per member against reference verdicts"""
+        self.temperatures = fit_temperatures(self.member_scores(texts, batch_size, "none"), reference)
+        return self.temperatures
+
+    def split_results(self, text, scores):
+        return split_results(text, scores)
+
+    def analyze(self, text):
+        """Return (result, detailed_result) for one claim, with the members' agreement"""
+        return next(self.analyze_many([text]))
+
+    def analyze_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW, detail_mode=None):
+        """Yield (result, detailed_result) for every claim, in input order"""
+        model_ids = [scorer.model_id for scorer in self.scorers]
+        for window_texts in chunked(texts, window):
+            scores, agreement, verdicts = self.score_batch_with_agreement(window_texts, batch_size, detail_mode)
+            for i, text in enumerate(window_texts):
+                result, detailed_result = self.split_results(text, scores[i])
+                result["agreement"] = float(agreement[i])
+                result["votes"] = {model_id: candidate_labels[v] for model_id, v in zip(model_ids, verdicts[:, i])}
+                yield result, detailed_result
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,248 @@
+"""
+Claim history store for incremental re-scoring and trend tracking.
+
+Claims are tracked per source (a product page, SKU or report id). Each
+run compares the claim text hash, the model/label-set version and the
+detail mode with what the source had last time, and only new, changed
+or stale claims go to the model; unchanged claims reuse their stored
+scores. Scores from a cheaper detail mode (no or only some indicators)
+are stale for a run that needs more of them. Every scoring
+is logged, so the verdict of a source can be followed over time.
+
+Usage:
+    python batch_score.py pages.csv scores.csv --id-column url --history claims.sqlite
+    python history.py show https://example.com/product/42
+    python history.py trend --period week
+    python history.py changed --since 2024-06-01
+"""
+import argparse
+import calendar
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from cache import normalize_claim
+from engine import DEFAULT_BATCH_SIZE, candidate_labels, detailed_labels
+
+DEFAULT_HISTORY_PATH = os.environ.get(
+    "GREENWASH_HISTORY",
+    os.path.join(os.path.expanduser("~"), ".cache", "greenwash", "history.sqlite"),
+)
+PERIODS = {"day": "%Y-%m-%d", "week": "%G-W%V", "month": "%Y-%m"}
+# Detail modes by how many indicators they score; stored scores serve runs of the same or a lower rank
+DETAIL_RANKS = {"none": 0, "hierarchical": 1, "all": 2}
+
+
+def claim_hash(text):
+    """Hash of the normalized claim text; whitespace-only edits keep the same hash"""
+    return hashlib.sha256(normalize_claim(text).encode("utf-8")).hexdigest()
+
+
+def prediction(scores):
+    """(top-level verdict, its score) from a score row"""
+    main = scores[:len(candidate_labels)]
+    best = int(np.nanargmax(main))
+    return candidate_labels[best], float(main[best])
+
+
+class ClaimHistory:
+    """SQLite log of the claims seen per source and the scores they received"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # Current claim and latest scores of every source
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "source_id TEXT PRIMARY KEY, claim_hash TEXT, model TEXT, label_hash TEXT, scores BLOB, "
+            "first_seen REAL, last_seen REAL, detail_mode TEXT)"
+        )
+        # One row per scoring, kept for trend queries
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            "source_id TEXT, observed REAL, status TEXT, claim_hash TEXT, text TEXT, model TEXT, "
+            "label_hash TEXT, prediction TEXT, confidence REAL, scores BLOB)"
+        )
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(sources)")]
+        if "detail_mode" not in columns:
+            # Stores from before detail modes were tracked; their rows count as stale once
+            self.db.execute("ALTER TABLE sources ADD COLUMN detail_mode TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS observations_source ON observations (source_id, observed)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS observations_time ON observations (observed)")
+        self.db.commit()
+
+    def _current(self, source_ids, columns):
+        rows = {}
+        source_ids = list(dict.fromkeys(source_ids))
+        for i in range(0, len(source_ids), 500):
+            part = source_ids[i:i + 500]
+            for row in self.db.execute(
+                f"SELECT source_id, {columns} FROM sources WHERE source_id IN ({','.join('?' * len(part))})",
+                part,
+            ):
+                rows[row[0]] = row[1:]
+        return rows
+
+    def plan(self, items, model_id, label_hash, detail_mode="all"):
+        """Return the status of each (source_id, text): new, changed, stale or unchanged"""
+        with self.lock:
+            current = self._current(
+                [source_id for source_id, _ in items], "claim_hash, model, label_hash, detail_mode"
+            )
+        statuses = []
+        for source_id, text in items:
+            row = current.get(source_id)
+            if row is None:
+                statuses.append("new")
+            elif row[0] != claim_hash(text):
+                statuses.append("changed")
+            elif row[1:3] != (model_id, label_hash):
+                statuses.append("stale")
+            elif DETAIL_RANKS.get(row[3], -1) < DETAIL_RANKS[detail_mode]:
+                statuses.append("stale")
+            else:
+                statuses.append("unchanged")
+        return statuses
+
+    def latest_scores(self, source_ids):
+        """Return {source_id: scores} of the last scoring of each source"""
+        with self.lock:
+            current = self._current(source_ids, "scores")
+        return {source_id: np.frombuffer(row[0], dtype=np.float32) for source_id, row in current.items()}
+
+    def record(self, items, statuses, scores, model_id, label_hash, detail_mode="all", now=None):
+        """Log a run: scored claims get an observation, unchanged ones just a last-seen time"""
+        now = now or time.time()
+        seen, observations, upserts = [], [], []
+        for (source_id, text), status, row in zip(items, statuses, scores):
+            if status == "unchanged":
+                seen.append((now, source_id))
+                continue
+            row = np.asarray(row, dtype=np.float32)
+            digest = claim_hash(text)
+            verdict, confidence = prediction(row)
+            observations.append(
+                (source_id, now, status, digest, text, model_id, label_hash, verdict, confidence, row.tobytes())
+            )
+            upserts.append((source_id, digest, model_id, label_hash, row.tobytes(), now, now, detail_mode))
+        with self.lock:
+            self.db.executemany("UPDATE sources SET last_seen = ? WHERE source_id = ?", seen)
+            self.db.executemany("INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", observations)
+            self.db.executemany(
+                "INSERT INTO sources VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(source_id) DO UPDATE SET "
+                "claim_hash = excluded.claim_hash, model = excluded.model, label_hash = excluded.label_hash, "
+                "scores = excluded.scores, last_seen = excluded.last_seen, detail_mode = excluded.detail_mode",
+                upserts,
+            )
+            self.db.commit()
+
+    def history(self, source_id):
+        """Every scoring of one source, oldest first"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT observed, status, text, model, prediction, confidence FROM observations "
+                "WHERE source_id = ? ORDER BY observed",
+                (source_id,),
+            ).fetchall()
+        return [
+            {"observed": observed, "status": status, "claim": text, "model": model,
+             "prediction": verdict, "confidence": confidence}
+            for observed, status, text, model, verdict, confidence in rows
+        ]
+
+    def trend(self, period="day"):
+        """Verdict counts across all sources at the end of each period
+
+        Each source counts with its most recent verdict as of that period,
+        so the series shows how the catalogue shifts as claims are edited.
+        """
+        fmt = PERIODS[period]
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT observed, source_id, prediction FROM observations ORDER BY observed"
+            ).fetchall()
+        current = {}
+        series = []
+        bucket = None
+        for observed, source_id, verdict in rows:
+            next_bucket = time.strftime(fmt, time.gmtime(observed))
+            if bucket is not None and next_bucket != bucket:
+                series.append((bucket, Counter(current.values())))
+            bucket = next_bucket
+            current[source_id] = verdict
+        if bucket is not None:
+            series.append((bucket, Counter(current.values())))
+        return [{"period": bucket, **{label: counts[label] for label in candidate_labels}} for bucket, counts in series]
+
+    def changed_since(self, since):
+        """Sources whose claim text changed after `since` (a Unix time)"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT DISTINCT source_id FROM observations WHERE status = 'changed' AND observed >= ? "
+                "ORDER BY source_id",
+                (since,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.db.close()
+
+
+def rescore(history, scorer, items, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+    """Score the new, changed and stale claims among (source_id, text) items
+
+    Unchanged claims reuse their stored scores, as long as they were
+    scored with at least `detail_mode` (default "all"). Returns the score
+    matrix for all items, in order, and the status of each.
+    """
+    items = list(items)
+    detail_mode = detail_mode or "all"
+    statuses = history.plan(items, scorer.model_id, scorer.label_hash, detail_mode)
+    scores = np.empty((len(items), len(candidate_labels) + len(detailed_labels)), dtype=np.float32)
+    todo = [i for i, status in enumerate(statuses) if status != "unchanged"]
+    if todo:
+        scores[todo] = scorer.score_batch([items[i][1] for i in todo], batch_size, detail_mode)
+    kept = history.latest_scores([items[i][0] for i, status in enumerate(statuses) if status == "unchanged"])
+    for i, status in enumerate(statuses):
+        if status == "unchanged":
+            scores[i] = kept[items[i][0]]
+    history.record(items, statuses, scores, scorer.model_id, scorer.label_hash, detail_mode)
+    return scores, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the claim history store")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_PATH, help="history SQLite file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="every scoring of one source")
+    show.add_argument("source_id")
+    trend = commands.add_parser("trend", help="verdict counts over time")
+    trend.add_argument("--period", choices=PERIODS, default="day")
+    changed = commands.add_parser("changed", help="sources whose claim changed since a date")
+    changed.add_argument("--since", required=True, help="YYYY-MM-DD (UTC)")
+    args = parser.parse_args()
+
+    history = ClaimHistory(args.db)
+    if args.command == "show":
+        for entry in history.history(args.source_id):
+            when = time.strftime("%Y-%m-%d %H:%M", time.gmtime(entry["observed"]))
+            print(f"{when}  {entry['status']:<8} {entry['prediction']:<22} {entry['confidence']:.2%}  {entry['claim']}")
+    elif args.command == "trend":
+        print(f"{'period':<10} " + " ".join(f"{label:>22}" for label in candidate_labels))
+        for row in history.trend(args.period):
+            print(f"{row['period']:<10} " + " ".join(f"{row[label]:>22}" for label in candidate_labels))
+    else:
+        since = calendar.timegm(time.strptime(args.since, "%Y-%m-%d"))
+        for source_id in history.changed_since(since):
+            print(source_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Ingredient-list analysis against a local sustainability knowledge base.
+
+Ingredient lists are parsed into items and normalized, then matched
+against the knowledge base with an Aho-Corasick automaton built once at
+import, so lookup is linear in the length of the list. Only items the
+knowledge base does not know, or whose matches disagree or are vague
+("natural", "sustainably sourced"), are sent to the zero-shot
+classifier, batched across every list in the call.
+"""
+import re
+import unicodedata
+from collections import Counter, deque
+
+from engine import DEFAULT_BATCH_SIZE
+
+# Normalized term -> (impact, note). Impacts: concern, certified, positive,
+# neutral, or ambiguous (always sent to the classifier)
+KNOWLEDGE_BASE = {
+    # Deforestation and habitat loss
+    "palm oil": ("concern", "Major driver of tropical deforestation unless certified"),
+    "palm kernel oil": ("concern", "Palm derivative linked to deforestation unless certified"),
+    "sodium lauryl sulfate": ("concern", "Surfactant commonly derived from palm kernel oil"),
+    "sodium laureth sulfate": ("concern", "Surfactant commonly derived from palm kernel oil"),
+    # Microplastics and persistent polymers
+    "microbeads": ("concern", "Plastic microbeads persist in waterways"),
+    "glitter": ("concern", "Usually plastic microparticles"),
+    "polyethylene": ("concern", "Plastic polymer; a common microplastic"),
+    "polypropylene": ("concern", "Plastic polymer; a common microplastic"),
+    "polyethylene terephthalate": ("concern", "PET plastic; a microplastic when in particle form"),
+    # Longer than "polyethylene", so the longest match keeps PEG out of the microplastics
+    "polyethylene glycol": ("neutral", "Water-soluble humectant, not a microplastic"),
+    "polymethyl methacrylate": ("concern", "Acrylic microplastic"),
+    "polystyrene": ("concern", "Plastic polymer that is rarely recycled"),
+    "nylon 6": ("concern", "Synthetic polyamide microplastic"),
+    "nylon 12": ("concern", "Synthetic polyamide microplastic"),
+    "acrylates copolymer": ("concern", "Synthetic polymer; a liquid or particle microplastic"),
+    "acrylates crosspolymer": ("concern", "Synthetic polymer; a liquid or particle microplastic"),
+    "cyclopentasiloxane": ("concern", "Persistent, bioaccumulative silicone (D5)"),
+    "cyclotetrasiloxane": ("concern", "Persistent, bioaccumulative silicone (D4)"),
+    "polyvinyl chloride": ("concern", "PVC; releases toxic compounds in production and disposal"),
+    # Petrochemicals and ecotoxic ingredients
+    "mineral oil": ("concern", "Petroleum-derived"),
+    "paraffin": ("concern", "Petroleum-derived"),
+    "petrolatum": ("concern", "Petroleum-derived"),
+    "triclosan": ("concern", "Antimicrobial that is toxic to aquatic life"),
+    "oxybenzone": ("concern", "UV filter linked to coral reef damage"),
+    "octinoxate": ("concern", "UV filter linked to coral reef damage"),
+    "bisphenol a": ("concern", "Endocrine disruptor that persists in the environment"),
+    "phthalate": ("concern", "Plasticizer and endocrine disruptor"),
+    # Third-party certifications
+    "certified organic": ("certified", "Certified organic agriculture"),
+    "organic": ("certified", "Organic agriculture; certified where the term is regulated"),
+    "rspo": ("certified", "Roundtable on Sustainable Palm Oil certification"),
+    "rspo certified": ("certified", "Roundtable on Sustainable Palm Oil certification"),
+    "certified sustainable palm oil": ("certified", "Certified sustainable palm oil (RSPO)"),
+    "fair trade": ("certified", "Fair trade certification"),
+    "fairtrade": ("certified", "Fairtrade certification"),
+    "rainforest alliance": ("certified", "Rainforest Alliance certification"),
+    "fsc": ("certified", "Forest Stewardship Council certification"),
+    "fsc certified": ("certified", "Forest Stewardship Council certification"),
+    "msc certified": ("certified", "Marine Stewardship Council certification"),
+    # Verifiable positive attributes
+    "recycled": ("positive", "Recycled content"),
+    "post consumer recycled": ("positive", "Post-consumer recycled content"),
+    "upcycled": ("positive", "Upcycled by-product"),
+    # Vague terms that need the classifier
+    "sustainable palm oil": ("ambiguous", "Sustainability claim without a named certification"),
+    "sustainable": ("ambiguous", "Vague sustainability term"),
+    "sustainably sourced": ("ambiguous", "Vague sourcing claim"),
+    "responsibly sourced": ("ambiguous", "Vague sourcing claim"),
+    "natural": ("ambiguous", "Unregulated term"),
+    "eco": ("ambiguous", "Vague eco claim"),
+    "eco friendly": ("ambiguous", "Vague eco claim"),
+    "green": ("ambiguous", "Vague eco claim"),
+    "biodegradable": ("ambiguous", "Depends on conditions and timeframe"),
+    "plant based": ("ambiguous", "Origin says little about environmental impact"),
+    "plant derived": ("ambiguous", "Origin says little about environmental impact"),
+    "fragrance": ("ambiguous", "Undisclosed mixture"),
+    "parfum": ("ambiguous", "Undisclosed mixture"),
+    # Common ingredients with no particular sustainability signal
+    "water": ("neutral", "Common ingredient"),
+    "aqua": ("neutral", "Common ingredient"),
+    "salt": ("neutral", "Common ingredient"),
+    "sodium chloride": ("neutral", "Common ingredient"),
+    "sodium bicarbonate": ("neutral", "Common ingredient"),
+    "sugar": ("neutral", "Common ingredient"),
+    "glycerin": ("neutral", "Common ingredient"),
+    "citric acid": ("neutral", "Common ingredient"),
+    "lactic acid": ("neutral", "Common ingredient"),
+    "xanthan gum": ("neutral", "Common ingredient"),
+    "tocopherol": ("neutral", "Vitamin E"),
+    "vinegar": ("neutral", "Common ingredient"),
+    "aloe vera": ("neutral", "Common ingredient"),
+    "aloe barbadensis leaf juice": ("neutral", "Aloe vera"),
+    "shea butter": ("neutral", "Common ingredient"),
+    "cocoa butter": ("neutral", "Common ingredient"),
+    "coconut oil": ("neutral", "Common ingredient"),
+}
+
+# Impact of items the classifier scored, by top-level verdict
+VERDICT_IMPACT = {"Greenwashing": "concern", "Genuine Sustainability": "positive", "Marketing Hype": "ambiguous"}
+
+PREFIX = re.compile(r"^\s*(ingredients?|inci)\s*:\s*", re.IGNORECASE)
+PERCENT = re.compile(r"\d+(?:[.,]\d+)?\s*%")
+# Parentheses without commas qualify the item before them: "palm oil (rspo certified)"
+QUALIFIER = re.compile(r"[(\[]([^()\[\],;]*)[)\]]")
+SEPARATORS = re.compile(r"[,;()\[\]]")
+
+
+def normalize_ingredient(name):
+    """Lowercase, NFKC-normalized ingredient name with punctuation collapsed to spaces"""
+    name = unicodedata.normalize("NFKC", name).lower()
+    name = PERCENT.sub(" ", name)
+    name = re.sub(r"[^\w\s]|_", " ", name)
+    return " ".join(name.split())
+
+
+def parse_ingredients(text):
+    """Split an ingredient list into item names, flattening sub-ingredient lists"""
+    text = PREFIX.sub("", text)
+    text = QUALIFIER.sub(r" \1", text)
+    items = []
+    for part in SEPARATORS.split(text):
+        part = " ".join(part.split()).strip(".* ")
+        if part:
+            items.append(part)
+    return items
+
+
+class TermIndex:
+    """Aho-Corasick automaton over normalized terms, matching whole words only"""
+
+    def __init__(self, terms):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for term in terms:
+            state = 0
+            for char in term:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(term)
+        # Breadth-first pass sets failure links and inherits their outputs
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, child in self.goto[state].items():
+                pending.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Longest non-overlapping whole-word terms in text, in order of position"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for term in output[state]:
+                start = end - len(term)
+                if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " "):
+                    found.append((start, end, term))
+        # Prefer longer terms: "certified sustainable palm oil" over "palm oil"
+        found.sort(key=lambda match: (match[0] - match[1], match[0]))
+        taken, chosen = [], []
+        for start, end, term in found:
+            if all(end <= s or start >= e for s, e in taken):
+                taken.append((start, end))
+                chosen.append((start, term))
+        return [term for _, term in sorted(chosen)]
+
+
+INDEX = TermIndex(KNOWLEDGE_BASE)
+
+
+def rate(matches):
+    """Combine the knowledge-base entries an item matched into (impact, note)
+
+    Returns None when the item should go to the classifier: nothing
+    matched, a vague term matched, or the matches contradict each other.
+    """
+    if not matches:
+        return None
+    entries = [KNOWLEDGE_BASE[term] for term in matches]
+    impacts = {impact for impact, _ in entries}
+    notes = "; ".join(note for _, note in entries)
+    if "ambiguous" in impacts:
+        return None
+    if "concern" in impacts:
+        if "certified" in impacts:
+            return "mitigated", notes
+        if "positive" in impacts:
+            return None
+        return "concern", notes
+    if impacts & {"certified", "positive"}:
+        return "positive", notes
+    return "neutral", notes
+
+
+def analyze_ingredient_lists(texts, scorer=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Return one analysis dict per ingredient list
+
+    Knowledge-base lookups are resolved locally; the remaining distinct
+    items across all lists are scored by `scorer` in one batch, or left
+    as "unknown" when no scorer is given.
+    """
+    analyses = []
+    forward = {}
+    for text in texts:
+        items = []
+        for name in parse_ingredients(text):
+            normalized = normalize_ingredient(name)
+            matches = INDEX.find(normalized)
+            rating = rate(matches)
+            item = {"ingredient": name, "normalized": normalized, "matches": matches}
+            if rating is None:
+                item.update(impact="unknown", note="", source="unscored")
+                forward.setdefault(normalized, []).append(item)
+            else:
+                item.update(impact=rating[0], note=rating[1], source="knowledge base")
+            items.append(item)
+        analyses.append({"ingredients": items})
+
+    if forward and scorer is not None:
+        names = list(forward)
+        scores = scorer.score_batch(names, batch_size, detail_mode="none")
+        for name, row in zip(names, scores):
+            result, _ = scorer.split_results(name, row)
+            verdict, score = result["labels"][0], result["scores"][0]
+            for item in forward[name]:
+                item.update(impact=VERDICT_IMPACT[verdict], note=f"Classifier: {verdict} ({score:.0%})",
+                            source="classifier")
+
+    for analysis in analyses:
+        analysis["summary"] = dict(Counter(item["impact"] for item in analysis["ingredients"]))
+    return analyses
+
+
+def analyze_ingredients(text, scorer=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Analyze a single ingredient list"""
+    return analyze_ingredient_lists([text], scorer, batch_size)[0]
@@ -0,0 +1,177 @@
+"""
+Lightweight in-process metrics for the scoring path.
+
+Histograms, counters and gauges are rendered in the Prometheus text
+exposition format by render(), which the HTTP service serves at
+/metrics and the batch tools can dump to a file. A per-request trace can
+be switched on around any block of work to collect the stage timings it
+went through.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Size buckets for batch and queue measurements
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name + _format_labels(self.labelnames, k), v) for k, v in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labelnames = labelnames
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        lines = []
+        with self.lock:
+            for labels, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    le = _format_labels(self.labelnames, labels, [("le", bound)])
+                    lines.append((f"{self.name}_bucket{le}", cumulative))
+                le = _format_labels(self.labelnames, labels, [("le", "+Inf")])
+                lines.append((f"{self.name}_bucket{le}", series["count"]))
+                lines.append((f"{self.name}_sum{_format_labels(self.labelnames, labels)}", series["sum"]))
+                lines.append((f"{self.name}_count{_format_labels(self.labelnames, labels)}", series["count"]))
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "greenwash_stage_seconds",
+    "Time spent per scoring stage (load, warmup, tokenize, assemble, forward, postprocess, render)",
+    labelnames=("stage",),
+)
+FORWARD_BATCH_PAIRS = Histogram(
+    "greenwash_forward_batch_pairs", "(claim, label) pairs per forward pass", buckets=SIZE_BUCKETS
+)
+MICROBATCH_CLAIMS = Histogram(
+    "greenwash_microbatch_claims", "Claims per micro-batch (service and app)", buckets=SIZE_BUCKETS
+)
+QUEUE_DEPTH = Gauge("greenwash_queue_depth", "Claims waiting in the micro-batch queue")
+CACHE_LOOKUPS = Counter("greenwash_cache_lookups_total", "Score cache lookups by outcome", labelnames=("result",))
+CLAIMS_SCORED = Counter("greenwash_claims_scored_total", "Claims scored by the model")
+MODEL_BYTES = Gauge("greenwash_model_bytes", "Estimated weight memory of each loaded model", labelnames=("model",))
+MODEL_EVENTS = Counter(
+    "greenwash_model_events_total", "Model registry loads and evictions", labelnames=("model", "event")
+)
+
+REGISTRY = [
+    STAGE_SECONDS, FORWARD_BATCH_PAIRS, MICROBATCH_CLAIMS, QUEUE_DEPTH, CACHE_LOOKUPS, CLAIMS_SCORED,
+    MODEL_BYTES, MODEL_EVENTS,
+]
+
+_trace = contextvars.ContextVar("greenwash_trace", default=None)
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a block under greenwash_stage_seconds{stage=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append({"stage": stage, "seconds": round(elapsed, 6)})
+
+
+@contextmanager
+def trace():
+    """Collect the stage timings of everything run inside the block
+
+    Yields a list that fills with {"stage", "seconds"} dicts, in order.
+    """
+    spans = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+
+def cache_hit_ratio():
+    hits = sum(v for k, v in CACHE_LOOKUPS.values.items() if k[0] != "miss")
+    total = sum(CACHE_LOOKUPS.values.values())
+    return hits / total if total else 0.0
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {value}" for name, value in metric.samples())
+    lines.append("# HELP greenwash_cache_hit_ratio Share of cache lookups served from memory or disk")
+    lines.append("# TYPE greenwash_cache_hit_ratio gauge")
+    lines.append(f"greenwash_cache_hit_ratio {cache_hit_ratio()}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    """Write the current metrics to a file"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render())
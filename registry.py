@@ -0,0 +1,234 @@
+"""
+Memory-bounded registry of loaded models.
+
+Models are keyed by (model id, backend, precision) and loaded on first
+use. Their weight memory is estimated from parameter sizes (or the ONNX
+graph size) and kept under a budget by evicting the least recently used
+models that no request holds. Callers acquire a model for the duration
+of their work, so a model is never dropped mid-batch; while every loaded
+model is in use the budget can be exceeded until one is released.
+
+    registry = ModelRegistry(budget_mb=4096, cache=ResultCache())
+    with registry.use(model_key("facebook/bart-large-mnli", precision="fp16")) as scorer:
+        scores = scorer.score_batch(claims)
+"""
+import itertools
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from engine import (
+    BACKENDS,
+    DEFAULT_BACKEND,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MODEL,
+    DEFAULT_PRECISION,
+    DEFAULT_WINDOW,
+    PRECISIONS,
+    candidate_labels,
+    chunked,
+    detailed_labels,
+    load_scorer,
+    split_results,
+)
+from metrics import MODEL_BYTES, MODEL_EVENTS
+
+# Budget for the weights of all loaded models; 0 disables eviction
+DEFAULT_BUDGET_MB = float(os.environ.get("GREENWASH_MODEL_MEMORY_MB", 4096))
+
+
+def model_key(model=DEFAULT_MODEL, backend=DEFAULT_BACKEND, precision=DEFAULT_PRECISION):
+    """Validated (model, backend, precision) registry key"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {tuple(PRECISIONS)}")
+    if backend != "torch" and precision != DEFAULT_PRECISION:
+        raise ValueError(f"Precision {precision!r} needs the torch backend")
+    return model, backend, precision
+
+
+def key_name(key):
+    """Readable form of a key for metrics and listings"""
+    model, backend, precision = key
+    return f"{model}@{backend}/{precision}"
+
+
+def model_bytes(scorer):
+    """Estimated memory held by a scorer's weights"""
+    model = scorer.model
+    if hasattr(model, "parameters"):
+        tensors = itertools.chain(model.parameters(), model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    # ONNX Runtime keeps roughly the graph file in memory
+    return os.path.getsize(model.path)
+
+
+class ModelRegistry:
+    """Lazily loaded models under a memory budget, evicted least recently used first"""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, cache=None, loader=load_scorer, **options):
+        self.budget = int(budget_mb * 2 ** 20)
+        self.cache = cache
+        self.loader = loader
+        # Extra keyword options for every load (detail_mode, ...)
+        self.options = options
+        self.lock = threading.Lock()
+        # key -> {"scorer", "bytes", "refs"}, least recently used first
+        self.entries = OrderedDict()
+        self.loading = {}
+        # Sizes of models loaded before, used to make room ahead of a reload
+        self.sizes = {}
+
+    def loaded_bytes(self):
+        return sum(entry["bytes"] for entry in self.entries.values())
+
+    def register(self, key, scorer):
+        """Add an already loaded scorer that is never evicted, such as a server's default model"""
+        size = model_bytes(scorer)
+        with self.lock:
+            self.entries[key] = {"scorer": scorer, "bytes": size, "refs": 1}
+            self.sizes[key] = size
+            evicted = self.evict()
+        MODEL_BYTES.set(size, key_name(key))
+        self.free(evicted)
+
+    def acquire(self, key):
+        """Return the scorer for a key, loading it if needed; pair every call with release(key)"""
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    entry["refs"] += 1
+                    self.entries.move_to_end(key)
+                    return entry["scorer"]
+                pending = self.loading.get(key)
+                if pending is None:
+                    pending = self.loading[key] = Future()
+                    evicted = self.evict(reserve=self.sizes.get(key, 0))
+                    break
+            # Another request is loading this model; wait for it, then take a reference
+            pending.result()
+        self.free(evicted)
+        try:
+            model, backend, precision = key
+            scorer = self.loader(model, cache=self.cache, backend=backend, precision=precision, **self.options)
+        except Exception as e:
+            with self.lock:
+                del self.loading[key]
+            pending.set_exception(e)
+            raise
+        size = model_bytes(scorer)
+        with self.lock:
+            del self.loading[key]
+            self.entries[key] = {"scorer": scorer, "bytes": size, "refs": 1}
+            self.sizes[key] = size
+            evicted = self.evict()
+        MODEL_EVENTS.inc(key_name(key), "load")
+        MODEL_BYTES.set(size, key_name(key))
+        pending.set_result(None)
+        self.free(evicted)
+        return scorer
+
+    def release(self, key):
+        with self.lock:
+            self.entries[key]["refs"] -= 1
+            evicted = self.evict()
+        self.free(evicted)
+
+    @contextmanager
+    def use(self, key):
+        """Hold a model for the duration of a block"""
+        scorer = self.acquire(key)
+        try:
+            yield scorer
+        finally:
+            self.release(key)
+
+    def evict(self, reserve=0):
+        """Drop idle models, least recently used first, until `reserve` more bytes fit the budget
+
+        Must be called with the lock held; returns the evicted keys.
+        """
+        evicted = []
+        if not self.budget:
+            return evicted
+        total = self.loaded_bytes() + reserve
+        for key, entry in list(self.entries.items()):
+            if total <= self.budget:
+                break
+            if entry["refs"] == 0:
+                del self.entries[key]
+                total -= entry["bytes"]
+                evicted.append(key)
+        return evicted
+
+    def free(self, evicted):
+        for key in evicted:
+            MODEL_EVENTS.inc(key_name(key), "evict")
+            MODEL_BYTES.set(0, key_name(key))
+        if evicted and "torch" in sys.modules:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def stats(self):
+        """Loaded models, least recently used first, with their size and active references"""
+        with self.lock:
+            models = [
+                {"model": key_name(key), "mb": round(entry["bytes"] / 2 ** 20, 1), "refs": entry["refs"]}
+                for key, entry in self.entries.items()
+            ]
+            loaded = self.loaded_bytes()
+        return {"budget_mb": round(self.budget / 2 ** 20, 1), "loaded_mb": round(loaded / 2 ** 20, 1), "models": models}
+
+
+class RegisteredScorer:
+    """Scorer for one registry key; a drop-in for ClaimScorer.score_batch
+
+    The model is acquired for each call, so it can be evicted between
+    calls and is loaded again by the next one.
+    """
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+        self.labels = candidate_labels + detailed_labels
+        self._ids = None
+
+    @property
+    def model_id(self):
+        return self.ids()[0]
+
+    @property
+    def label_hash(self):
+        return self.ids()[1]
+
+    def ids(self):
+        """(model_id, label_hash) of the model, loading it the first time they are needed"""
+        if self._ids is None:
+            with self.registry.use(self.key) as scorer:
+                self._ids = scorer.model_id, scorer.label_hash
+        return self._ids
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        with self.registry.use(self.key) as scorer:
+            return scorer.score_batch(texts, batch_size, detail_mode)
+
+    def split_results(self, text, scores):
+        return split_results(text, scores)
+
+    def analyze(self, text):
+        """Return (result, detailed_result) for one claim"""
+        return next(self.analyze_many([text]))
+
+    def analyze_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW, detail_mode=None):
+        """Yield (result, detailed_result) for every claim, in input order"""
+        for window_texts in chunked(texts, window):
+            scores = self.score_batch(window_texts, batch_size, detail_mode)
+            for text, row in zip(window_texts, scores):
+                yield self.split_results(text, row)
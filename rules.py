@@ -0,0 +1,178 @@
+"""
+Rule-based lexical pre-classifier for obvious buzzword claims.
+
+Compiled keyword patterns count green buzzwords, hype terms and
+specificity signals (numbers, percentages, certifications, measurable
+units) for a batch of claims at once. Short claims with no specifics
+that stack several buzzwords, or pair a buzzword with hype, get a
+verdict straight from the rules; everything else, including a single
+descriptive "green" or "natural", goes on to the model. `calibrate` measures how often
+the short-circuited verdicts agree with a reference.
+"""
+import re
+
+import numpy as np
+
+from engine import DEFAULT_BATCH_SIZE, DEFAULT_WINDOW, RecentValues, candidate_labels, chunked, detailed_labels
+
+# Score given to the rule's verdict and indicators; other categories get 1 - RULE_CONFIDENCE
+RULE_CONFIDENCE = 0.9
+# Longer claims usually carry context the rules cannot read
+MAX_RULE_WORDS = 25
+# One "green" or "natural" is often descriptive ("green tea", "natural rubber")
+MIN_BUZZWORDS = 2
+
+PATTERNS = {
+    "buzzwords": re.compile(
+        r"\b(eco[- ]?friendly|environmentally[- ]friendly|earth[- ]friendly|planet[- ]friendly|"
+        r"good for the (environment|planet|earth)|green(er)?|eco|natural|all[- ]natural|sustainable|"
+        r"conscious|clean|non[- ]toxic|chemical[- ]free|guilt[- ]free|kind to the planet|"
+        r"protects? the planet|earth[- ]conscious|better for the (environment|planet))\b",
+        re.IGNORECASE,
+    ),
+    "hype": re.compile(
+        r"(\b(revolutionar(y|ize)|revolutionise|amazing|incredible|life[- ]changing|miracle|ultimate|"
+        r"best[- ]ever|game[- ]changer|unbelievable|magic(al)?|perfect)\b)",
+        re.IGNORECASE,
+    ),
+    "numbers": re.compile(r"\b\d+(?:[.,]\d+)?\b"),
+    "percentages": re.compile(r"\d+(?:[.,]\d+)?\s*(%|percent\b)", re.IGNORECASE),
+    "certifications": re.compile(
+        r"\b(certified|certification|third[- ]party|verified|audited|accredited|iso ?14001|b ?corp|fsc|pefc|"
+        r"fair[- ]?trade|rainforest alliance|gots|oeko[- ]tex|energy star|ecolabel|cradle to cradle|rspo|"
+        r"usda organic|sbti|science[- ]based targets?)\b",
+        re.IGNORECASE,
+    ),
+    "measures": re.compile(
+        r"\b(tonnes?|tons?|kg|kwh|mwh|co2e?|ghg|scope [123]|life[- ]cycle assessment|lca|by 20\d\d|"
+        r"since 20\d\d|baseline)\b",
+        re.IGNORECASE,
+    ),
+}
+FEATURES = list(PATTERNS) + ["words"]
+
+# (name, verdict, flagged indicators); conditions are in LexicalPreClassifier.classify
+RULES = [
+    ("vague_buzzwords", "Greenwashing", ["Vague sustainability statement", "Generic green buzzwords"]),
+    ("unsupported_hype", "Marketing Hype", ["Emotional appeal without proof", "Generic green buzzwords"]),
+]
+
+
+class LexicalPreClassifier:
+    """Keyword and specificity rules that either decide a claim or forward it"""
+
+    def __init__(self, max_words=MAX_RULE_WORDS, confidence=RULE_CONFIDENCE, min_buzzwords=MIN_BUZZWORDS):
+        self.max_words = max_words
+        self.min_buzzwords = min_buzzwords
+        self.confidence = confidence
+        self.labels = candidate_labels + detailed_labels
+        # One precomputed score row per rule, in the model's column order
+        self.rule_rows = np.full((len(RULES), len(self.labels)), np.nan, dtype=np.float32)
+        for i, (_, verdict, indicators) in enumerate(RULES):
+            self.rule_rows[i, :len(candidate_labels)] = 1 - confidence
+            self.rule_rows[i, self.labels.index(verdict)] = confidence
+            for indicator in indicators:
+                self.rule_rows[i, self.labels.index(indicator)] = confidence
+
+    def features(self, texts):
+        """(n_claims, n_features) matrix of pattern counts and word counts"""
+        matrix = np.zeros((len(texts), len(FEATURES)), dtype=np.int32)
+        for i, text in enumerate(texts):
+            for j, pattern in enumerate(PATTERNS.values()):
+                matrix[i, j] = len(pattern.findall(text))
+            matrix[i, -1] = len(text.split())
+        return matrix
+
+    def classify(self, texts):
+        """Index into RULES of the rule deciding each claim, or -1 to forward it to the model"""
+        f = self.features(texts)
+        column = {name: f[:, j] for j, name in enumerate(FEATURES)}
+        specific = column["numbers"] + column["percentages"] + column["certifications"] + column["measures"]
+        plain = (specific == 0) & (column["words"] <= self.max_words)
+        decided = np.full(len(texts), -1)
+        decided[plain & (column["buzzwords"] >= self.min_buzzwords) & (column["hype"] == 0)] = 0
+        # Hype alone is just enthusiasm; it needs a green buzzword to be a sustainability claim
+        decided[plain & (column["buzzwords"] > 0) & (column["hype"] > 0)] = 1
+        return decided
+
+
+class RuleScorer:
+    """Pre-classifier in front of a scorer; a drop-in for ClaimScorer.score_batch"""
+
+    def __init__(self, scorer, rules=None):
+        self.scorer = scorer
+        self.rules = rules or LexicalPreClassifier()
+        self.labels = self.rules.labels
+        # Rule verdicts differ from the model's, so cached and stored scores must not mix
+        self.model_id = f"{scorer.model_id}+rules"
+        self.label_hash = scorer.label_hash
+        self.short_circuited = 0
+        self.forwarded = 0
+        self.decisions = RecentValues()
+
+    def score_batch_with_rules(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        """Return (scores, rule names) for a list of claims; the name is None where the model scored"""
+        texts = list(texts)
+        decided = self.rules.classify(texts)
+        scores = np.empty((len(texts), len(self.labels)), dtype=np.float32)
+        ruled = decided >= 0
+        scores[ruled] = self.rules.rule_rows[decided[ruled]]
+        forward = np.flatnonzero(~ruled)
+        if forward.size:
+            scores[forward] = self.scorer.score_batch([texts[i] for i in forward], batch_size, detail_mode)
+        self.short_circuited += int(ruled.sum())
+        self.forwarded += int(forward.size)
+        names = [RULES[d][0] if d >= 0 else None for d in decided]
+        self.decisions.update(texts, names)
+        return scores, names
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        return self.score_batch_with_rules(texts, batch_size, detail_mode)[0]
+
+    def rule_of(self, texts):
+        """Rule that decided each recently scored claim, None where the model scored it or it is unseen"""
+        return self.decisions.get_many(texts)
+
+    def split_results(self, text, scores):
+        return self.scorer.split_results(text, scores)
+
+    def analyze(self, text):
+        """Return (result, detailed_result) for one claim, tagged with the deciding rule"""
+        return next(self.analyze_many([text]))
+
+    def analyze_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW, detail_mode=None):
+        """Yield (result, detailed_result) for every claim, in input order"""
+        for window_texts in chunked(texts, window):
+            scores, rules = self.score_batch_with_rules(window_texts, batch_size, detail_mode)
+            for text, row, rule in zip(window_texts, scores, rules):
+                result, detailed_result = self.split_results(text, row)
+                result["rule"] = detailed_result["rule"] = rule
+                yield result, detailed_result
+
+
+def calibrate(texts, reference, rules=None):
+    """Precision of the short-circuited verdicts against reference verdicts
+
+    `reference` holds one top-level label per claim, from human labels or
+    from the model. Returns overall and per-rule coverage and precision.
+    """
+    rules = rules or LexicalPreClassifier()
+    decided = rules.classify(list(texts))
+    reference = np.asarray(reference, dtype=object)
+    report = {"claims": len(decided), "rules": {}}
+    correct = 0
+    for i, (name, verdict, _) in enumerate(RULES):
+        fired = decided == i
+        hits = int(np.sum(reference[fired] == verdict))
+        correct += hits
+        report["rules"][name] = {
+            "verdict": verdict,
+            "fired": int(fired.sum()),
+            "coverage": float(fired.mean()) if len(decided) else 0.0,
+            "precision": hits / int(fired.sum()) if fired.any() else None,
+        }
+    short_circuited = int(np.sum(decided >= 0))
+    report["short_circuited"] = short_circuited
+    report["coverage"] = short_circuited / len(decided) if len(decided) else 0.0
+    report["precision"] = correct / short_circuited if short_circuited else None
+    return report
@@ -0,0 +1,354 @@
+"""
+Standalone HTTP scoring service with a micro-batching request queue.
+
+Concurrent requests are gathered into micro-batches for up to
+--max-wait-ms or --max-batch-size claims, then scored together on a
+worker thread; one model's forward passes never overlap.
+
+Usage:
+    python service.py --port 8080 --max-batch-size 64 --max-wait-ms 10
+
+Endpoints:
+    POST /score        {"claim": "..."}        -> {"result": ..., "detailed_result": ...}
+    POST /score/batch  {"claims": ["...", ...]} -> {"results": [{"result": ..., "detailed_result": ...}, ...]}
+    GET  /health       liveness, with the startup state
+    GET  /ready        200 once the model is loaded and warmed up, 503 before
+    GET  /metrics      Prometheus text format
+
+The server starts listening right away and loads the model (from --artifact
+if given) on the model thread, so orchestrators can poll /ready.
+
+Add "trace": true to a request body to get the queue wait and per-stage
+timings of the micro-batch that served it.
+
+A request can pick another model with "model", "backend" and "precision"
+fields, among the models listed with --models. Each model gets its own
+micro-batch queue and model thread; models are loaded on first use and
+evicted least recently used first to stay within --model-memory-mb.
+With "ensemble": true, the default model and every --models model score
+the claim side by side and their scores are fused (--ensemble-method,
+calibrated with --ensemble-temperatures); the result then carries the
+models' agreement and votes. Ensemble members take turns with the
+models' own queues rather than scoring alongside them.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from aiohttp import web
+
+from artifact import DEFAULT_ARTIFACT_DIR, Readiness, load_artifact, read_manifest
+from cache import DEFAULT_CACHE_PATH, ResultCache
+import metrics
+from engine import BACKENDS, DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, DEFAULT_MODEL, DETAIL_MODES, load_scorer
+from ensemble import FUSION_METHODS, EnsembleScorer
+from registry import DEFAULT_BUDGET_MB, ModelRegistry, RegisteredScorer, model_key
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 10
+# Largest number of claims accepted by one /score/batch request
+MAX_REQUEST_CLAIMS = 10000
+
+
+class LockedScorer(RegisteredScorer):
+    """RegisteredScorer that holds its model's lock while scoring, for ensemble members"""
+
+    def __init__(self, registry, key, lock):
+        super().__init__(registry, key)
+        self.lock = lock
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        with self.lock:
+            return super().score_batch(texts, batch_size, detail_mode)
+
+
+class MicroBatcher:
+    """Collect claims from concurrent requests and score them in micro-batches"""
+
+    def __init__(self, scorer, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 batch_size=DEFAULT_BATCH_SIZE, lock=None):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue()
+        # Micro-batches run one at a time on this thread; the lock is shared with the
+        # ensemble's member for the same model, whose calls run on the ensemble's threads
+        self.lock = lock or threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scorer")
+        self.worker = None
+        self.batches = 0
+        self.claims = 0
+
+    def start(self):
+        self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown(wait=True)
+
+    async def score(self, text):
+        """Queue one claim and wait for (result, detailed_result, trace)"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        metrics.QUEUE_DEPTH.set(self.queue.qsize())
+        return await future
+
+    async def next_batch(self):
+        """Wait for a claim, then gather more until the batch is full or the window closes"""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        metrics.QUEUE_DEPTH.set(self.queue.qsize())
+        return batch
+
+    def score_texts(self, texts):
+        """Score a micro-batch on the model thread, recording its stage timings"""
+        with self.lock, metrics.trace() as spans:
+            results = list(self.scorer.analyze_many(texts, self.batch_size))
+        return results, spans
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            # Skip requests whose callers already went away
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+            texts = [text for text, _, _ in batch]
+            metrics.MICROBATCH_CLAIMS.observe(len(batch))
+            started = time.perf_counter()
+            try:
+                results, spans = await loop.run_in_executor(self.executor, self.score_texts, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.claims += len(batch)
+            for (_, future, queued), (result, detailed_result) in zip(batch, results):
+                if not future.done():
+                    trace = {"queue_seconds": round(started - queued, 6), "batch_claims": len(batch), "spans": spans}
+                    future.set_result((result, detailed_result, trace))
+
+
+def to_response(result, detailed_result, trace, with_trace=False):
+    response = {"result": result, "detailed_result": detailed_result}
+    if with_trace:
+        response["trace"] = trace
+    return response
+
+
+def check_ready(request):
+    if not request.app["readiness"].ready:
+        raise web.HTTPServiceUnavailable(text=f"Model is {request.app['readiness'].state}")
+
+
+def batcher_for(request, body):
+    """Micro-batcher of the model or ensemble a request names, or of the default model"""
+    app = request.app
+    default_key = app["default_key"]
+    if body.get("ensemble"):
+        key = "ensemble"
+    elif not any(field in body for field in ("model", "backend", "precision")):
+        return app["batchers"][default_key]
+    else:
+        model, backend, precision = default_key
+        try:
+            key = model_key(body.get("model", model), body.get("backend", backend), body.get("precision", precision))
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+        if key[0] not in app["models"]:
+            raise web.HTTPBadRequest(text=f"Model {key[0]!r} is not served; expected one of {sorted(app['models'])}")
+    batcher = app["batchers"].get(key)
+    if batcher is None:
+        # Models are loaded by the batcher's thread on its first micro-batch
+        if key == "ensemble":
+            scorer = app["ensemble"]
+        else:
+            scorer = RegisteredScorer(app["registry"], key)
+        default = app["batchers"][default_key]
+        batcher = app["batchers"][key] = MicroBatcher(
+            scorer, default.max_batch_size, default.max_wait * 1000, default.batch_size, app["model_locks"][key]
+        )
+        batcher.start()
+    return batcher
+
+
+async def read_body(request, expected):
+    """Parsed JSON object of a request, or 400 with the expected shape"""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"Malformed JSON; expected {expected}")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=f"Expected JSON body {expected}")
+    return body
+
+
+async def score(request):
+    check_ready(request)
+    body = await read_body(request, '{"claim": "<text>"}')
+    claim = body.get("claim")
+    if not isinstance(claim, str) or not claim.strip():
+        raise web.HTTPBadRequest(text='Expected JSON body {"claim": "<text>"}')
+    scored = await batcher_for(request, body).score(claim)
+    return web.json_response(to_response(*scored, with_trace=bool(body.get("trace"))))
+
+
+async def score_batch(request):
+    check_ready(request)
+    body = await read_body(request, '{"claims": ["<text>", ...]}')
+    claims = body.get("claims")
+    if not isinstance(claims, list) or not all(isinstance(c, str) for c in claims):
+        raise web.HTTPBadRequest(text='Expected JSON body {"claims": ["<text>", ...]}')
+    if len(claims) > MAX_REQUEST_CLAIMS:
+        raise web.HTTPRequestEntityTooLarge(max_size=MAX_REQUEST_CLAIMS, actual_size=len(claims))
+    batcher = batcher_for(request, body)
+    results = await asyncio.gather(*(batcher.score(claim) for claim in claims))
+    with_trace = bool(body.get("trace"))
+    return web.json_response({"results": [to_response(*r, with_trace=with_trace) for r in results]})
+
+
+async def health(request):
+    batcher = request.app["batchers"][request.app["default_key"]]
+    return web.json_response({
+        "status": "ok",
+        "model": batcher.scorer.model_id if batcher.scorer else None,
+        "startup": request.app["readiness"].to_dict(),
+        "queue_depth": batcher.queue.qsize(),
+        "batches": batcher.batches,
+        "claims": batcher.claims,
+        "registry": request.app["registry"].stats(),
+    })
+
+
+async def ready(request):
+    readiness = request.app["readiness"].to_dict()
+    return web.json_response(readiness, status=200 if readiness["state"] == "ready" else 503)
+
+
+async def metrics_text(request):
+    return web.Response(text=metrics.render(), content_type="text/plain")
+
+
+def create_app(scorer=None, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+               batch_size=DEFAULT_BATCH_SIZE, loader=None, registry=None, default_key=None, models=(),
+               ensemble_method="average", ensemble_weights=None, ensemble_temperatures=None):
+    """Build the aiohttp application around a loaded scorer, or one that `loader` returns at startup
+
+    `default_key` is the registry key of that scorer; requests may also
+    name any model in `models`, which `registry` loads on demand, or ask
+    for the ensemble of the default model and `models`.
+    """
+    app = web.Application()
+    app["readiness"] = Readiness()
+    app["registry"] = registry or ModelRegistry()
+    app["default_key"] = default_key or model_key()
+    app["models"] = {app["default_key"][0], *models}
+    app["batchers"] = {}
+    # One lock per model, held by its micro-batcher and its ensemble member while they score
+    app["model_locks"] = defaultdict(threading.Lock)
+    members = [app["default_key"]] + [model_key(model, *app["default_key"][1:]) for model in models]
+    app["ensemble"] = EnsembleScorer(
+        [LockedScorer(app["registry"], key, app["model_locks"][key]) for key in members], ensemble_weights,
+        ensemble_method, ensemble_temperatures,
+    )
+    if scorer is not None:
+        app["readiness"].scorer = scorer
+        app["readiness"].set_state("ready")
+        app["registry"].register(app["default_key"], scorer)
+
+    def load(batcher):
+        batcher.scorer = app["readiness"].run(loader)
+        app["registry"].register(app["default_key"], batcher.scorer)
+
+    async def on_startup(app):
+        lock = app["model_locks"][app["default_key"]]
+        batcher = MicroBatcher(scorer, max_batch_size, max_wait_ms, batch_size, lock)
+        app["batchers"][app["default_key"]] = batcher
+        if scorer is None:
+            # Load and warm up on the model thread while the server already answers health checks
+            asyncio.get_running_loop().run_in_executor(batcher.executor, load, batcher)
+        batcher.start()
+
+    async def on_cleanup(app):
+        for batcher in app["batchers"].values():
+            await batcher.stop()
+        app["ensemble"].close()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/score", score)
+    app.router.add_post("/score/batch", score_batch)
+    app.router.add_get("/health", health)
+    app.router.add_get("/ready", ready)
+    app.router.add_get("/metrics", metrics_text)
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP service for scoring sustainability claims")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--models", nargs="*", default=[],
+                        help="other models that requests may choose with a \"model\" field")
+    parser.add_argument("--model-memory-mb", type=float, default=DEFAULT_BUDGET_MB,
+                        help="weight memory budget for all loaded models; least recently used ones are evicted")
+    parser.add_argument("--ensemble-method", choices=FUSION_METHODS, default="average",
+                        help="how \"ensemble\" requests fuse the models' scores")
+    parser.add_argument("--ensemble-weights", type=float, nargs="*",
+                        help="one weight per ensemble member: the default model, then each of --models")
+    parser.add_argument("--ensemble-temperatures", type=float, nargs="*",
+                        help="one calibration temperature per ensemble member, as fitted by batch_score.py "
+                        "--calibration-csv")
+    parser.add_argument("--artifact", default=DEFAULT_ARTIFACT_DIR,
+                        help="load from a prebuilt artifact directory instead of the hub (default: $GREENWASH_ARTIFACT)")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="most claims scored together in one micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="how long to wait for more claims before scoring a micro-batch")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="(claim, label) pairs per forward pass")
+    parser.add_argument("--detail-mode", choices=DETAIL_MODES, default="all",
+                        help="score all indicators, only those of leading categories, or none")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite score cache shared with the app")
+    parser.add_argument("--no-cache", action="store_true", help="always run the model")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cache = None if args.no_cache else ResultCache(args.cache)
+    model = args.model
+    if args.artifact:
+        # The artifact decides the default model, so requests naming it reach the loaded scorer
+        model = read_manifest(args.artifact)["model"]
+        loader = partial(load_artifact, args.artifact, cache=cache, backend=args.backend, detail_mode=args.detail_mode)
+    else:
+        loader = partial(load_scorer, args.model, cache=cache, backend=args.backend, detail_mode=args.detail_mode)
+    registry = ModelRegistry(args.model_memory_mb, cache=cache, detail_mode=args.detail_mode)
+    app = create_app(None, args.max_batch_size, args.max_wait_ms, args.batch_size, loader=loader, registry=registry,
+                     default_key=model_key(model, args.backend), models=args.models,
+                     ensemble_method=args.ensemble_method, ensemble_weights=args.ensemble_weights,
+                     ensemble_temperatures=args.ensemble_temperatures or None)
+    web.run_app(app, host=args.host, port=args.port)
@@ -0,0 +1,61 @@
+"""
+Shared fixtures; tests run without downloading a model.
+"""
+import os
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import ClaimScorer, candidate_labels, detailed_labels, split_results  # noqa: E402
+
+WORDS = "our product is eco friendly made from recycled materials this example".split()
+
+
+class FakeScorer:
+    """Deterministic stand-in for ClaimScorer that records what it was asked to score"""
+
+    def __init__(self, model_id="fake-model", label_hash="fake-labels"):
+        self.model_id = model_id
+        self.label_hash = label_hash
+        self.labels = candidate_labels + detailed_labels
+        self.scored = []
+
+    def score_batch(self, texts, batch_size=256, detail_mode=None):
+        texts = list(texts)
+        self.scored.extend(texts)
+        scores = np.array(
+            [np.random.default_rng(zlib.crc32(text.encode())).random(len(self.labels)) for text in texts],
+            dtype=np.float32,
+        ).reshape(len(texts), len(self.labels))
+        if detail_mode == "none":
+            scores[:, len(candidate_labels):] = np.nan
+        return scores
+
+    def split_results(self, text, scores):
+        return split_results(text, scores)
+
+
+@pytest.fixture
+def scorer():
+    return FakeScorer()
+
+
+@pytest.fixture
+def tiny_scorer(tmp_path):
+    """ClaimScorer around a randomly initialized one-layer NLI model"""
+    from transformers import DistilBertConfig, DistilBertForSequenceClassification, DistilBertTokenizerFast
+
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    # Short enough that long claims are truncated
+    tokenizer = DistilBertTokenizerFast(vocab_file=str(vocab), model_max_length=64)
+    config = DistilBertConfig(
+        vocab_size=64, dim=16, hidden_dim=16, n_layers=1, n_heads=2, num_labels=3,
+        id2label={0: "contradiction", 1: "neutral", 2: "entailment"},
+        label2id={"contradiction": 0, "neutral": 1, "entailment": 2},
+    )
+    return ClaimScorer(DistilBertForSequenceClassification(config).eval(), tokenizer, model_id="tiny")
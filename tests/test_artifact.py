@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from artifact import MANIFEST, load_artifact
+from engine import LABEL_HASH
+
+
+@pytest.fixture
+def artifact(tmp_path, tiny_scorer):
+    tiny_scorer.tokenizer.save_pretrained(str(tmp_path))
+    tiny_scorer.model.save_pretrained(str(tmp_path), safe_serialization=True)
+    manifest = {"model": "tiny", "backends": ["torch"], "label_hash": LABEL_HASH}
+    (tmp_path / MANIFEST).write_text(json.dumps(manifest))
+    return tmp_path
+
+
+def test_artifact_loads_with_current_labels(artifact):
+    assert load_artifact(str(artifact)).model_id == "tiny"
+
+
+def test_artifact_of_another_label_set_is_rejected(artifact):
+    manifest = json.loads((artifact / MANIFEST).read_text())
+    (artifact / MANIFEST).write_text(json.dumps({**manifest, "label_hash": "0123456789abcdef"}))
+    with pytest.raises(ValueError, match="label set"):
+        load_artifact(str(artifact))
@@ -0,0 +1,51 @@
+import csv
+import json
+import os
+
+import pytest
+
+import batch_score
+from conftest import FakeScorer
+
+
+class CrashingScorer(FakeScorer):
+    """Fails part way through writing the chunk holding `claim`"""
+
+    def __init__(self, claim):
+        super().__init__()
+        self.claim = claim
+
+    def split_results(self, text, scores):
+        if text == self.claim:
+            raise RuntimeError("killed")
+        return super().split_results(text, scores)
+
+
+def test_resume_after_a_crash_writes_every_row_once(tmp_path, monkeypatch):
+    input_path, output_path = str(tmp_path / "claims.csv"), str(tmp_path / "scores.csv")
+    claims = [f"Claim number {i} is eco friendly" for i in range(10)]
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sku", "claim"])
+        writer.writerows((f"sku-{i}", claim) for i, claim in enumerate(claims))
+    argv = [input_path, output_path, "--id-column", "sku", "--no-cache", "--chunk-size", "3",
+            "--checkpoint-every", "1"]
+
+    monkeypatch.setattr(batch_score, "load_scorer", lambda *args, **kwargs: CrashingScorer(claims[7]))
+    with pytest.raises(RuntimeError, match="killed"):
+        batch_score.run(batch_score.parse_args(argv))
+    with open(output_path + ".ckpt") as f:
+        checkpoint = json.load(f)
+    assert checkpoint["rows_done"] == 6
+    # Row 6 was written before the crash but is past the checkpoint
+    assert os.path.getsize(output_path) > checkpoint["output_bytes"]
+
+    resumed = FakeScorer()
+    monkeypatch.setattr(batch_score, "load_scorer", lambda *args, **kwargs: resumed)
+    batch_score.run(batch_score.parse_args(argv))
+    assert resumed.scored == claims[6:]
+    with open(output_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["id"] for row in rows] == [f"sku-{i}" for i in range(10)]
+    assert [row["claim"] for row in rows] == claims
+    assert not os.path.exists(output_path + ".ckpt")
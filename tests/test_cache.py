@@ -0,0 +1,39 @@
+import numpy as np
+
+from cache import ResultCache, cache_key, normalize_claim
+from engine import LABEL_HASH
+
+ROW = np.arange(3, dtype=np.float32)
+
+
+def test_normalize_claim_folds_width_and_whitespace():
+    assert normalize_claim("  Eco　friendly\n\tbottle ") == "Eco friendly bottle"
+    assert normalize_claim("ＣＯ２ neutral") == "CO2 neutral"
+
+
+def test_cache_key_changes_with_model_labels_and_claim():
+    key = cache_key("Eco friendly", "model-a", LABEL_HASH)
+    assert key == cache_key(" Eco  friendly ", "model-a", LABEL_HASH)
+    assert key != cache_key("Eco friendly", "model-b", LABEL_HASH)
+    assert key != cache_key("Eco friendly", "model-a", "other-labels")
+    assert key != cache_key("eco friendly", "model-a", LABEL_HASH)
+
+
+def test_scores_of_other_label_sets_survive_until_pruned(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old, new = cache_key("claim", "m", "old-labels"), cache_key("claim", "m", LABEL_HASH)
+    ResultCache(path).put_many({old: ROW}, "m", "old-labels")
+    cache = ResultCache(path)
+    cache.put_many({new: ROW}, "m", LABEL_HASH)
+    assert set(ResultCache(path).get_many([old, new])) == {old, new}
+    assert cache.prune(label_hash=LABEL_HASH) == 1
+    assert set(ResultCache(path).get_many([old, new])) == {new}
+
+
+def test_prune_by_age(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    key = cache_key("claim", "m", LABEL_HASH)
+    cache.put_many({key: ROW}, "m", LABEL_HASH)
+    assert cache.prune(older_than=3600) == 0
+    assert cache.prune(older_than=3600, now=cache.entries()[0][3] + 7200) == 1
+    assert cache.get_many([key]) == {}
@@ -0,0 +1,27 @@
+from dedup import NearDuplicateIndex, score_deduplicated
+
+CLAIMS = [
+    "Our bottles are made from recycled ocean plastic.",
+    "Our bottles are made from recycled ocean plastic!",
+    "Certified organic cotton, grown without pesticides.",
+    "Carbon neutral shipping on every order.",
+]
+
+
+def test_near_duplicates_share_one_model_call(scorer):
+    index = NearDuplicateIndex(0.7)
+    scores, clusters, scored = score_deduplicated(index, scorer, CLAIMS)
+    assert clusters[0] == clusters[1] and len(set(clusters)) == 3
+    assert scored == 3 and (scores[0] == scores[1]).all()
+
+
+def test_index_keeps_at_most_max_clusters(scorer):
+    index = NearDuplicateIndex(0.7, max_clusters=1)
+    for claim in CLAIMS[2:]:
+        score_deduplicated(index, scorer, [claim])
+    score_deduplicated(index, scorer, CLAIMS[:1])
+    assert len(index.clusters) == 2 and len(index.scores) == 2
+    assert sum(len(bucket) for bucket in index.buckets) <= 2 * index.bands
+    # The dropped cluster is forgotten: its claim starts a new cluster and is scored again
+    _, clusters, scored = score_deduplicated(index, scorer, CLAIMS[2:3])
+    assert scored == 1 and clusters[0] == index.stats()["clusters"] - 1
@@ -0,0 +1,16 @@
+from documents import analyze_document, summarize
+
+SECTIONS = [
+    (f"Section {i}", " ".join(f"Our factory {i} cut carbon emissions by {n} percent this year." for n in range(10)))
+    for i in range(8)
+]
+
+
+def test_sections_stream_before_the_report_is_scored(scorer):
+    summaries = analyze_document(SECTIONS, scorer, window=16)
+    first = next(summaries)
+    assert first["section"] == "Section 0" and first["claims"] == 10
+    assert len(scorer.scored) < 80
+    rest = list(summaries)
+    assert len(scorer.scored) == 80
+    assert summarize([first] + rest)["claims"] == 80
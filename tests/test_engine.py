@@ -0,0 +1,61 @@
+import numpy as np
+
+from background import BackgroundScorer
+from engine import HYPOTHESIS_TEMPLATE, candidate_labels, detailed_labels
+from metrics import CLAIMS_SCORED, FORWARD_BATCH_PAIRS
+
+CLAIMS = ["Our product is eco friendly", "Made from recycled materials"]
+
+
+def pairs_run():
+    return sum(series["sum"] for series in FORWARD_BATCH_PAIRS.series.values())
+
+
+def claims_scored():
+    return sum(CLAIMS_SCORED.values.values())
+
+
+def test_verdict_then_full_runs_each_pair_once(tiny_scorer):
+    expected = tiny_scorer.run_batch(CLAIMS)
+    pairs, claims = pairs_run(), claims_scored()
+    verdicts = tiny_scorer.score_batch(CLAIMS, detail_mode="none")
+    assert np.isnan(verdicts[:, len(candidate_labels):]).all()
+    full = tiny_scorer.score_batch(CLAIMS, detail_mode="all")
+    assert pairs_run() - pairs == len(CLAIMS) * len(tiny_scorer.labels)
+    assert claims_scored() - claims == len(CLAIMS)
+    np.testing.assert_allclose(full, expected, atol=1e-5)
+
+
+def test_background_analyze_scores_claim_once(tiny_scorer):
+    background = BackgroundScorer(tiny_scorer, max_wait_ms=0)
+    pairs, claims = pairs_run(), claims_scored()
+    verdict, full = background.analyze(CLAIMS[0])
+    result, detailed_result = full.result(timeout=30)
+    assert verdict.result(timeout=30)[0]["labels"] == result["labels"]
+    assert detailed_result
+    assert pairs_run() - pairs == len(tiny_scorer.labels)
+    assert claims_scored() - claims == 1
+
+
+def test_run_batch_ignores_partial_rows(tiny_scorer):
+    tiny_scorer.score_batch(CLAIMS, detail_mode="hierarchical")
+    pairs = pairs_run()
+    tiny_scorer.run_batch(CLAIMS, detail_mode="none")
+    assert pairs_run() - pairs == len(CLAIMS) * len(candidate_labels)
+
+
+def test_fused_pass_matches_the_pipeline(tiny_scorer):
+    from transformers import pipeline
+
+    classifier = pipeline("zero-shot-classification", model=tiny_scorer.model, tokenizer=tiny_scorer.tokenizer)
+    long_claim = " ".join(["our product is made from recycled materials"] * 20)
+    assert len(tiny_scorer.tokenizer(long_claim)["input_ids"]) > tiny_scorer.max_length
+    for claim in CLAIMS + [long_claim]:
+        result, detailed_result = tiny_scorer.analyze(claim)
+        for ours, labels in ((result, candidate_labels), (detailed_result, detailed_labels)):
+            expected = classifier(claim, labels, multi_label=True, hypothesis_template=HYPOTHESIS_TEMPLATE)
+            assert ours["sequence"] == expected["sequence"]
+            # The tiny model scores labels near-identically, so compare by label rather than rank
+            scores = dict(zip(expected["labels"], expected["scores"]))
+            assert sorted(ours["labels"]) == sorted(scores)
+            np.testing.assert_allclose(ours["scores"], [scores[label] for label in ours["labels"]], atol=1e-5)
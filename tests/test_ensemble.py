@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from conftest import FakeScorer
+from ensemble import EnsembleScorer, read_reference
+from rules import RuleScorer
+
+CLAIMS = [
+    "Our product is eco-friendly and good for the environment.",
+    "Made with 30% recycled plastic verified by an independent auditor.",
+]
+
+
+def test_agreement_survives_wrapping():
+    ensemble = EnsembleScorer([FakeScorer("a"), FakeScorer("b")], concurrent=False)
+    scorer = RuleScorer(ensemble)
+    _, rules = scorer.score_batch_with_rules(CLAIMS)
+    agreement = ensemble.agreement_of(CLAIMS)
+    assert rules[0] is not None and np.isnan(agreement[0])
+    assert rules[1] is None and agreement[1] in (0.5, 1.0)
+
+
+def test_calibration_sets_one_temperature_per_member(tmp_path):
+    path = tmp_path / "labels.csv"
+    path.write_text("claim,label\n" + "\n".join(f'"{c}",Greenwashing' for c in CLAIMS) + "\n")
+    ensemble = EnsembleScorer([FakeScorer("a"), FakeScorer("b")], method="vote", concurrent=False)
+    temperatures = ensemble.calibrate(*read_reference(str(path)))
+    assert temperatures.shape == (2,)
+    assert ensemble.score_batch(CLAIMS).shape == (2, len(ensemble.labels))
+
+
+def test_unknown_reference_label_is_an_error(tmp_path):
+    path = tmp_path / "labels.csv"
+    path.write_text("claim,label\nGreen stuff,Fine\n")
+    with pytest.raises(ValueError, match="Fine"):
+        read_reference(str(path))
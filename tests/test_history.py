@@ -0,0 +1,39 @@
+import numpy as np
+
+from history import ClaimHistory, rescore
+
+
+def items(n):
+    return [(f"sku-{i}", f"Claim number {i} is eco-friendly") for i in range(n)]
+
+
+def test_unchanged_claims_reuse_stored_scores(tmp_path, scorer):
+    history = ClaimHistory(str(tmp_path / "history.sqlite"))
+    first, statuses = rescore(history, scorer, items(5))
+    assert statuses == ["new"] * 5
+    scorer.scored.clear()
+    second, statuses = rescore(history, scorer, items(5))
+    assert statuses == ["unchanged"] * 5
+    assert scorer.scored == []
+    np.testing.assert_array_equal(first, second)
+
+
+def test_edited_claim_is_rescored(tmp_path, scorer):
+    history = ClaimHistory(str(tmp_path / "history.sqlite"))
+    rescore(history, scorer, items(3))
+    edited = items(3)
+    edited[1] = ("sku-1", "Now 100% recycled packaging")
+    _, statuses = rescore(history, scorer, edited)
+    assert statuses == ["unchanged", "changed", "unchanged"]
+
+
+def test_verdict_only_scores_are_stale_for_a_full_run(tmp_path, scorer):
+    history = ClaimHistory(str(tmp_path / "history.sqlite"))
+    partial, statuses = rescore(history, scorer, items(50), detail_mode="none")
+    assert np.isnan(partial[:, 3:]).all()
+    full, statuses = rescore(history, scorer, items(50), detail_mode="all")
+    assert statuses == ["stale"] * 50
+    assert not np.isnan(full).any()
+    # A later verdict-only run can reuse the complete scores
+    _, statuses = rescore(history, scorer, items(50), detail_mode="none")
+    assert statuses == ["unchanged"] * 50
@@ -0,0 +1,8 @@
+from ingredients import analyze_ingredients
+
+
+def test_polyethylene_glycol_is_not_a_microplastic():
+    analysis = analyze_ingredients("Water, Polyethylene Glycol, Polyethylene")
+    assert analysis["ingredients"][1]["matches"] == ["polyethylene glycol"]
+    impacts = {item["ingredient"]: item["impact"] for item in analysis["ingredients"]}
+    assert impacts == {"Water": "neutral", "Polyethylene Glycol": "neutral", "Polyethylene": "concern"}
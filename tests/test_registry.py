@@ -0,0 +1,112 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from registry import ModelRegistry, model_key
+
+MB = 2 ** 20
+
+
+class StubLoader:
+    """Loader of stub scorers whose weights are a file of `mb` megabytes"""
+
+    def __init__(self, tmp_path, mb=0.4):
+        self.tmp_path = tmp_path
+        self.size = int(mb * MB)
+        self.calls = []
+        self.entered = threading.Event()
+        self.proceed = threading.Event()
+        self.proceed.set()
+        self.error = None
+
+    def __call__(self, model, **options):
+        self.calls.append(model)
+        self.entered.set()
+        self.proceed.wait(5)
+        if self.error:
+            raise self.error
+        path = self.tmp_path / f"{model}.onnx"
+        path.write_bytes(b"\0" * self.size)
+        return SimpleNamespace(model=SimpleNamespace(path=str(path)), model_id=model)
+
+
+def loaded(registry):
+    return [key[0] for key in registry.entries]
+
+
+def test_models_in_use_are_never_evicted(tmp_path):
+    registry = ModelRegistry(budget_mb=1, loader=StubLoader(tmp_path))
+    for model in "abc":
+        registry.acquire(model_key(model))
+    # 1.2 MB held against a 1 MB budget: nothing is idle, so nothing goes
+    assert loaded(registry) == ["a", "b", "c"]
+    registry.release(model_key("b"))
+    assert loaded(registry) == ["a", "c"]
+
+
+def test_idle_models_are_evicted_least_recently_used_first(tmp_path):
+    loader = StubLoader(tmp_path)
+    registry = ModelRegistry(budget_mb=1, loader=loader)
+    for model in "ab":
+        with registry.use(model_key(model)):
+            pass
+    with registry.use(model_key("a")):
+        pass
+    with registry.use(model_key("c")):
+        assert loaded(registry) == ["a", "c"]
+    with registry.use(model_key("a")):
+        pass
+    assert loader.calls == ["a", "b", "c"]
+
+
+def test_concurrent_acquires_load_a_model_once(tmp_path):
+    loader = StubLoader(tmp_path)
+    loader.proceed.clear()
+    registry = ModelRegistry(budget_mb=1, loader=loader)
+    key = model_key("a")
+    scorers = []
+    threads = [threading.Thread(target=lambda: scorers.append(registry.acquire(key))) for _ in range(3)]
+    threads[0].start()
+    assert loader.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    loader.proceed.set()
+    for thread in threads:
+        thread.join(5)
+    assert loader.calls == ["a"]
+    assert len(scorers) == 3 and all(scorer is scorers[0] for scorer in scorers)
+    assert registry.entries[key]["refs"] == 3
+
+
+def test_failed_load_reaches_waiting_callers(tmp_path):
+    loader = StubLoader(tmp_path)
+    loader.proceed.clear()
+    loader.error = OSError("no such model")
+    registry = ModelRegistry(budget_mb=1, loader=loader)
+    key = model_key("a")
+    errors = []
+
+    def acquire():
+        try:
+            registry.acquire(key)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=acquire) for _ in range(2)]
+    threads[0].start()
+    assert loader.entered.wait(5)
+    threads[1].start()
+    loader.proceed.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 2 and all(e is loader.error for e in errors)
+    assert registry.loading == {} and registry.entries == {}
+    # The next request tries the load again
+    loader.error = None
+    assert registry.acquire(key).model_id == "a"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="backend"):
+        model_key("a", backend="tpu")
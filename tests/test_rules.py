@@ -0,0 +1,37 @@
+import pytest
+
+from rules import RULES, LexicalPreClassifier, RuleScorer
+
+CLAIMS = [
+    "Our product is eco-friendly and good for the environment.",
+    "Made with 30% recycled plastic verified by an independent auditor.",
+]
+
+
+def test_rule_of_tells_rule_verdicts_from_model_scores(scorer):
+    rules = RuleScorer(scorer)
+    _, names = rules.score_batch_with_rules(CLAIMS)
+    assert names[0] is not None and names[1] is None
+    assert scorer.scored == CLAIMS[1:]
+    assert rules.rule_of(CLAIMS + ["unseen"]) == names + [None]
+
+
+@pytest.mark.parametrize("claim, rule", [
+    ("Our product is eco-friendly and good for the environment.", "vague_buzzwords"),
+    ("Sustainable, natural and kind to the planet.", "vague_buzzwords"),
+    ("This amazing natural product will revolutionize your life!", "unsupported_hype"),
+])
+def test_obvious_buzzword_claims_are_decided(claim, rule):
+    decided = LexicalPreClassifier().classify([claim])[0]
+    assert decided >= 0 and RULES[decided][0] == rule
+
+
+@pytest.mark.parametrize("claim", [
+    "We cut packaging weight by a third last year!",
+    "Made from ocean plastic collected by our partners!",
+    "Green tea extract shampoo.",
+    "We use a natural rubber sole from Sri Lanka.",
+    "Amazing value, the best ever price!",
+])
+def test_plain_or_descriptive_claims_go_to_the_model(claim):
+    assert LexicalPreClassifier().classify([claim])[0] == -1
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from conftest import FakeScorer
+from service import create_app
+
+
+def post_all(scorer, requests):
+    """Status and body of each (path, raw body) request against a fresh app"""
+    async def run():
+        async with TestClient(TestServer(create_app(scorer, max_wait_ms=0))) as client:
+            responses = []
+            for path, data in requests:
+                response = await client.post(path, data=data)
+                responses.append((response.status, await response.text()))
+            return responses
+
+    return asyncio.run(run())
+
+
+def test_bad_bodies_are_client_errors(tiny_scorer):
+    responses = post_all(tiny_scorer, [
+        ("/score", "{not json"),
+        ("/score", '["a claim"]'),
+        ("/score", '{"claim": 3}'),
+        ("/score/batch", b"\xff"),
+        ("/score/batch", '"claims"'),
+        ("/score/batch", '{"claims": "one claim"}'),
+    ])
+    assert [status for status, _ in responses] == [400] * len(responses)
+    assert "Malformed JSON" in responses[0][1]
+
+
+def test_valid_claim_is_scored(tiny_scorer):
+    [(status, text)] = post_all(tiny_scorer, [("/score", '{"claim": "Our product is eco friendly"}')])
+    assert status == 200 and '"detailed_result"' in text
+
+
+class OverlapScorer(FakeScorer):
+    """Records the most forward passes that were ever running at once"""
+
+    def __init__(self, weights):
+        super().__init__()
+        self.model = SimpleNamespace(path=weights)
+        self.lock = threading.Lock()
+        self.running = self.most_running = 0
+
+    def score_batch(self, texts, batch_size=256, detail_mode=None):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return super().score_batch(texts, batch_size, detail_mode)
+
+    def analyze_many(self, texts, batch_size=256, detail_mode=None):
+        scores = self.score_batch(texts, batch_size, detail_mode)
+        return [self.split_results(text, row) for text, row in zip(texts, scores)]
+
+
+def test_ensemble_requests_take_turns_with_the_default_model(tmp_path):
+    weights = tmp_path / "model.onnx"
+    weights.write_bytes(b"0")
+    scorer = OverlapScorer(str(weights))
+
+    async def run():
+        async with TestClient(TestServer(create_app(scorer, max_wait_ms=0))) as client:
+            bodies = [{"claim": f"Claim {i}", "ensemble": i % 2 == 0} for i in range(8)]
+            responses = await asyncio.gather(*(client.post("/score", data=json.dumps(body)) for body in bodies))
+            return [response.status for response in responses]
+
+    assert asyncio.run(run()) == [200] * 8
+    assert scorer.most_running == 1
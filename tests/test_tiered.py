@@ -0,0 +1,35 @@
+import zlib
+
+import numpy as np
+
+from conftest import FakeScorer
+from engine import candidate_labels
+from tiered import TieredScorer
+
+CLAIMS = ["Eco-friendly and green", "30% recycled plastic, audited", "Natural goodness", "Carbon neutral since 2020"]
+
+
+class FakeEncoder:
+    """Deterministic unit vectors per text"""
+
+    def encode(self, texts):
+        vectors = np.stack([np.random.default_rng(zlib.crc32(t.encode())).normal(size=8) for t in texts])
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_score_batch_is_a_plain_matrix():
+    scorer = FakeScorer()
+    tiered = TieredScorer(scorer, FakeEncoder(), margin=0.3)
+    scores, tiers = tiered.score_batch_with_tiers(CLAIMS)
+    np.testing.assert_array_equal(tiered.score_batch(CLAIMS), scores)
+    assert scores.shape == (len(CLAIMS), len(tiered.labels))
+    assert set(tiers) <= {"embedding", "nli"}
+    assert scorer.scored.count(CLAIMS[0]) == 2 * (tiers[0] == "nli")
+    assert tiered.tier_of(CLAIMS + ["unseen"]) == list(tiers) + [None]
+
+
+def test_fast_tier_honours_detail_mode():
+    tiered = TieredScorer(FakeScorer(), FakeEncoder(), margin=0)
+    scores, tiers = tiered.score_batch_with_tiers(CLAIMS, detail_mode="none")
+    assert (tiers == "embedding").all()
+    assert np.isnan(scores[:, len(candidate_labels):]).all()
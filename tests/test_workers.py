@@ -0,0 +1,58 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+from safetensors.torch import load_file, save_file
+from transformers import DistilBertConfig, DistilBertForSequenceClassification
+
+from workers import load_mapped_model
+
+
+@pytest.fixture
+def weights(tmp_path):
+    config = DistilBertConfig(vocab_size=64, dim=16, hidden_dim=16, n_layers=1, n_heads=2, num_labels=3)
+    DistilBertForSequenceClassification(config).save_pretrained(str(tmp_path), safe_serialization=True)
+    return str(tmp_path)
+
+
+def test_mapped_model_loads_complete_weights(weights):
+    model = load_mapped_model(weights)
+    assert model.classifier.weight.shape == (3, 16)
+
+
+def test_missing_weight_is_an_error(weights):
+    path = glob.glob(os.path.join(weights, "*.safetensors"))[0]
+    state = load_file(path)
+    del state["classifier.weight"]
+    save_file(state, path)
+    with pytest.raises(ValueError, match="classifier.weight"):
+        load_mapped_model(weights)
+
+
+def test_pool_workers_use_the_scoring_options(tmp_path, tiny_scorer):
+    from workers import WorkerPool
+
+    model_dir = str(tmp_path / "tiny")
+    tiny_scorer.model.save_pretrained(model_dir, safe_serialization=True)
+    tiny_scorer.tokenizer.save_pretrained(model_dir)
+    claims = ["Our product is eco friendly", "Made from recycled materials"]
+    options = {"detail_mode": "hierarchical", "min_confidence": 1.0, "detail_margin": 0.0}
+    pool = WorkerPool(model_dir, workers=1, root=str(tmp_path / "weights"), **options)
+    try:
+        scores = pool.score_batch(claims)
+    finally:
+        pool.close()
+    for key, value in options.items():
+        setattr(tiny_scorer, key, value)
+    expected = tiny_scorer.run_batch(claims, detail_mode="hierarchical")
+    np.testing.assert_allclose(scores, expected, atol=1e-5)
+    # Only the winning category's indicators are scored
+    assert np.isnan(scores).any()
+
+
+def test_workers_need_the_torch_backend():
+    from batch_score import parse_args
+
+    with pytest.raises(SystemExit):
+        parse_args(["in.csv", "out.csv", "--workers", "2", "--backend", "onnx"])
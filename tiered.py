@@ -0,0 +1,145 @@
+"""
+Tiered scoring: a bi-encoder fast path in front of the NLI scorer.
+
+Each claim is embedded once and compared by cosine similarity against
+precomputed label embeddings, so its cost does not grow with the size of
+`label_map`. Only claims whose top-two category margin falls below a
+threshold are re-scored by the zero-shot NLI model.
+
+Fast-tier rows are softmax probabilities over the categories (and over
+the indicators), not per-label entailment probabilities, so they are not
+on the NLI scale; score_batch_with_tiers reports which tier produced
+each row, and batch_score.py --tiered writes it to a `tier` column.
+"""
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from engine import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_WINDOW,
+    RecentValues,
+    candidate_labels,
+    chunked,
+    detailed_labels,
+    label_map,
+    split_results,
+)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Claims whose top-two category probabilities are closer than this go to NLI
+DEFAULT_MARGIN = 0.2
+# Softmax temperature turning cosine similarities into probabilities
+DEFAULT_TEMPERATURE = 0.05
+
+
+class SentenceEncoder:
+    """Mean-pooled, L2-normalized sentence embeddings from a transformer"""
+
+    def __init__(self, model=DEFAULT_EMBEDDING_MODEL, batch_size=64, max_length=256):
+        self.model_id = model
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModel.from_pretrained(model).eval()
+        if torch.cuda.is_available():
+            self.model.to("cuda")
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def encode(self, texts):
+        """Return an (n_texts, dim) float32 array of unit vectors"""
+        embeddings = []
+        for chunk in chunked(texts, self.batch_size):
+            inputs = self.tokenizer(
+                chunk, padding=True, truncation=True, max_length=self.max_length, return_tensors="pt"
+            ).to(self.model.device)
+            with torch.inference_mode():
+                hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            embeddings.append(pooled.float().cpu().numpy())
+        embeddings = np.concatenate(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+
+def softmax(x, temperature):
+    """Row-wise softmax of x / temperature"""
+    z = x / temperature
+    z = z - z.max(-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(-1, keepdims=True)
+
+
+class TieredScorer:
+    """Embedding similarity first, NLI re-scoring only for uncertain claims; a drop-in for ClaimScorer.score_batch"""
+
+    def __init__(self, scorer, encoder, margin=DEFAULT_MARGIN, temperature=DEFAULT_TEMPERATURE):
+        self.scorer = scorer
+        self.encoder = encoder
+        self.margin = margin
+        self.temperature = temperature
+        self.labels = candidate_labels + detailed_labels
+        # Fast-tier rows differ from the model's, so cached and stored scores must not mix
+        self.model_id = f"{scorer.model_id}+tiered({getattr(encoder, 'model_id', 'encoder')};{margin:g})"
+        self.label_hash = scorer.label_hash
+        self.tiers = RecentValues()
+        n_main = len(candidate_labels)
+        label_vectors = encoder.encode(self.labels)
+        # A category is represented by its name together with its indicators
+        categories = []
+        for i, category in enumerate(candidate_labels):
+            members = [i] + [self.labels.index(label, n_main) for label in label_map[category]]
+            centroid = label_vectors[members].mean(0)
+            categories.append(centroid / np.linalg.norm(centroid))
+        self.category_vectors = np.stack(categories)
+        self.indicator_vectors = label_vectors[n_main:]
+
+    def fast_scores(self, embeddings):
+        """Return (main, detailed) probabilities from cosine similarity"""
+        main = softmax(embeddings @ self.category_vectors.T, self.temperature)
+        detailed = softmax(embeddings @ self.indicator_vectors.T, self.temperature)
+        return main, detailed
+
+    def score_batch_with_tiers(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        """Return (scores, tiers) for a list of claims
+
+        scores follows the column order of the NLI scorer's labels; tiers
+        names the engine that produced each row. With detail_mode "none"
+        the fast tier leaves the indicators NaN, like the NLI scorer.
+        """
+        texts = list(texts)
+        main, detailed = self.fast_scores(self.encoder.encode(texts))
+        top_two = np.sort(main, axis=1)[:, -2:]
+        uncertain = np.flatnonzero(top_two[:, 1] - top_two[:, 0] < self.margin)
+        scores = np.hstack([main, detailed]).astype(np.float32)
+        if detail_mode == "none":
+            scores[:, len(candidate_labels):] = np.nan
+        tiers = np.full(len(texts), "embedding", dtype=object)
+        if uncertain.size:
+            scores[uncertain] = self.scorer.score_batch([texts[i] for i in uncertain], batch_size, detail_mode)
+            tiers[uncertain] = "nli"
+        self.tiers.update(texts, tiers)
+        return scores, tiers
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        return self.score_batch_with_tiers(texts, batch_size, detail_mode)[0]
+
+    def tier_of(self, texts):
+        """Tier that scored each claim recently, None for claims it has not seen"""
+        return self.tiers.get_many(texts)
+
+    def split_results(self, text, scores):
+        return split_results(text, scores)
+
+    def analyze(self, text):
+        """Return (result, detailed_result) for one claim, tagged with its tier"""
+        return next(self.analyze_many([text]))
+
+    def analyze_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW, detail_mode=None):
+        """Yield (result, detailed_result) for every claim, in input order"""
+        for window_texts in chunked(texts, window):
+            scores, tiers = self.score_batch_with_tiers(window_texts, batch_size, detail_mode)
+            for text, row, tier in zip(window_texts, scores, tiers):
+                result, detailed_result = self.split_results(text, row)
+                result["tier"] = detailed_result["tier"] = tier
+                yield result, detailed_result
@@ -0,0 +1,205 @@
+"""
+Multi-process scoring with one shared, memory-mapped copy of the weights.
+
+The model is saved once as safetensors. Each worker process maps that
+file read-only and points its parameters straight at the mapped pages,
+so the OS page cache holds a single copy of the weights however many
+workers run. Batches are sharded across workers, and every worker is
+pinned to its own cores with a matching torch thread count.
+"""
+import glob
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MODEL,
+    DEFAULT_WINDOW,
+    LABEL_HASH,
+    ClaimScorer,
+    chunked,
+    split_results,
+)
+
+DEFAULT_WEIGHTS_DIR = os.environ.get(
+    "GREENWASH_WEIGHTS_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "greenwash", "weights"),
+)
+
+SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+def weights_dir(model, root=DEFAULT_WEIGHTS_DIR):
+    """Directory holding the safetensors weights, config and tokenizer of a model"""
+    return os.path.join(root, model.replace("/", "--"))
+
+
+def prepare_weights(model=DEFAULT_MODEL, root=DEFAULT_WEIGHTS_DIR):
+    """Save a model as safetensors once so workers can memory-map it"""
+    out_dir = weights_dir(model, root)
+    if glob.glob(os.path.join(out_dir, "*.safetensors")):
+        return out_dir
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    AutoTokenizer.from_pretrained(model).save_pretrained(out_dir)
+    AutoModelForSequenceClassification.from_pretrained(model).save_pretrained(out_dir, safe_serialization=True)
+    return out_dir
+
+
+def mmap_safetensors(path):
+    """Return {name: tensor} backed by a read-only memory map of a safetensors file"""
+    import torch
+
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header_size = struct.unpack("<Q", mapped[:8])[0]
+    header = json.loads(mapped[8:8 + header_size])
+    data_start = 8 + header_size
+    tensors = {}
+    with warnings.catch_warnings():
+        # torch warns that the buffer is not writable; the weights are never written
+        warnings.simplefilter("ignore", UserWarning)
+        for name, info in header.items():
+            if name == "__metadata__":
+                continue
+            dtype = getattr(torch, SAFETENSORS_DTYPES[info["dtype"]])
+            begin, end = info["data_offsets"]
+            if end == begin:
+                tensors[name] = torch.empty(info["shape"], dtype=dtype)
+                continue
+            count = (end - begin) // torch.tensor([], dtype=dtype).element_size()
+            tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + begin)
+            tensors[name] = tensor.reshape(info["shape"])
+    return tensors
+
+
+def load_mapped_model(model_dir):
+    """Build a classifier whose parameters alias the memory-mapped weights"""
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    config = AutoConfig.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_config(config)
+    state = {}
+    for path in sorted(glob.glob(os.path.join(model_dir, "*.safetensors"))):
+        state.update(mmap_safetensors(path))
+    # assign=True swaps in the mapped tensors instead of copying into fresh ones
+    loaded = model.load_state_dict(state, strict=False, assign=True)
+    # save_pretrained leaves out weights tied to another one; anything else missing would stay random
+    missing = [key for key in loaded.missing_keys if not matches_any(key, ignorable_keys(model, "missing"))]
+    unexpected = [key for key in loaded.unexpected_keys if not matches_any(key, ignorable_keys(model, "unexpected"))]
+    if missing or unexpected:
+        raise ValueError(f"Weights in {model_dir} do not match the model: missing {missing}, unexpected {unexpected}")
+    model.tie_weights()
+    return model.eval()
+
+
+def ignorable_keys(model, kind):
+    """Key patterns transformers itself tolerates as missing (tied weights) or unexpected"""
+    patterns = list(getattr(model, f"_keys_to_ignore_on_load_{kind}", None) or [])
+    if kind == "missing":
+        # Declared per submodule: a list in older transformers, a {tied: source} dict in newer ones
+        for name, module in model.named_modules():
+            prefix = re.escape(f"{name}.") if name else ""
+            patterns += [prefix + key for key in getattr(module, "_tied_weights_keys", None) or []]
+    return patterns
+
+
+def matches_any(key, patterns):
+    return any(re.search(pattern, key) for pattern in patterns)
+
+
+_scorer = None
+
+
+def _init_worker(model_dir, model_id, threads, counter, options):
+    """Pin this worker to its own cores and load the mapped model
+
+    `options` (detail_mode, min_confidence, detail_margin) go to ClaimScorer.
+    """
+    global _scorer
+    import torch
+    from transformers import AutoTokenizer
+
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    if hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        mine = cores[index * threads:(index + 1) * threads] or cores
+        os.sched_setaffinity(0, mine)
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    _scorer = ClaimScorer(load_mapped_model(model_dir), tokenizer, model_id=model_id, **options)
+
+
+def _score_shard(texts, batch_size, detail_mode):
+    return _scorer.run_batch(texts, batch_size, detail_mode or _scorer.detail_mode)
+
+
+class WorkerPool:
+    """Process pool that shards score_batch calls across N model workers
+
+    Workers run the torch backend on memory-mapped weights; extra keyword
+    options (detail_mode, min_confidence, detail_margin) are passed to
+    each worker's ClaimScorer.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, workers=None, threads_per_worker=None, root=DEFAULT_WEIGHTS_DIR,
+                 **options):
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        self.workers = workers or cores
+        self.threads = threads_per_worker or max(1, cores // self.workers)
+        self.model_id = model
+        self.label_hash = LABEL_HASH
+        model_dir = prepare_weights(model, root)
+        context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_dir, model, self.threads, context.Value("i", 0), options),
+        )
+
+    def score_batch(self, texts, batch_size=DEFAULT_BATCH_SIZE, detail_mode=None):
+        """Return an (n_claims, n_labels) score matrix computed across all workers"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Deal length-sorted claims round-robin so every shard gets a similar mix
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        n_shards = min(self.workers, len(texts))
+        shards = [order[k::n_shards] for k in range(n_shards)]
+        futures = [
+            self.executor.submit(_score_shard, [texts[i] for i in shard], batch_size, detail_mode)
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+        scores = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+        for shard, shard_scores in zip(shards, results):
+            scores[shard] = shard_scores
+        return scores
+
+    def split_results(self, text, scores):
+        return split_results(text, scores)
+
+    def analyze_many(self, texts, batch_size=DEFAULT_BATCH_SIZE, window=DEFAULT_WINDOW, detail_mode=None):
+        """Yield (result, detailed_result) for every claim, in input order"""
+        for window_texts in chunked(texts, window):
+            for text, row in zip(window_texts, self.score_batch(window_texts, batch_size, detail_mode)):
+                yield split_results(text, row)
+
+    def close(self):
+        self.executor.shutdown(wait=True)